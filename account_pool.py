@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Account Pool
+Routes extractions across several bot accounts, quarantining accounts Instagram throttles or challenges
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+STATE_HEALTHY = "healthy"
+STATE_QUARANTINED = "quarantined"
+
+
+def parse_accounts(spec):
+    """Parse 'user:password,user2:password2' into (username, password) pairs"""
+    accounts = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        username, _, password = item.partition(':')
+        if username and password:
+            accounts.append((username.strip(), password))
+    return accounts
+
+
+def load_accounts(path):
+    """Read [{"username": ..., "password": ...}, ...] from a JSON file"""
+    with open(path, 'r') as accounts_file:
+        return [(entry["username"], entry["password"]) for entry in json.load(accounts_file)]
+
+
+class Account:
+    def __init__(self, client):
+        self.client = client
+        self.username = client.username
+        self.inflight = 0
+        self.state = STATE_HEALTHY
+        self.quarantined_until = 0.0
+        self.quarantine_reason = None
+        self.stats = {"extractions": 0, "failures": 0, "quarantines": 0, "busy_seconds": 0.0}
+
+    def available(self, now):
+        if self.state == STATE_QUARANTINED and now >= self.quarantined_until:
+            logger.info(f"Account {self.username} released from quarantine")
+            self.state = STATE_HEALTHY
+            self.quarantine_reason = None
+        return self.state == STATE_HEALTHY
+
+    def as_dict(self, uptime):
+        return {
+            **self.stats,
+            "busy_seconds": round(self.stats["busy_seconds"], 3),
+            "state": self.state,
+            "inflight": self.inflight,
+            "quarantine_reason": self.quarantine_reason,
+            "quarantined_for": round(max(0.0, self.quarantined_until - time.time()), 1) if self.state == STATE_QUARANTINED else 0,
+            "extractions_per_minute": round(self.stats["extractions"] / uptime * 60, 2) if uptime else 0.0
+        }
+
+
+class AccountPool:
+    def __init__(self, clients, classify_error, throttle_quarantine=600.0, challenge_quarantine=6 * 3600.0):
+        # classify_error(exc) returns "throttle", "challenge" or None
+        self.accounts = [Account(client) for client in clients]
+        self.classify_error = classify_error
+        self.throttle_quarantine = throttle_quarantine
+        self.challenge_quarantine = challenge_quarantine
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, clients, classify_error):
+        """Create a pool with quarantine times from INSTAGRAM_ACCOUNT_* environment variables"""
+        return cls(
+            clients,
+            classify_error,
+            throttle_quarantine=float(os.getenv('INSTAGRAM_ACCOUNT_THROTTLE_QUARANTINE', '600')),
+            challenge_quarantine=float(os.getenv('INSTAGRAM_ACCOUNT_CHALLENGE_QUARANTINE', str(6 * 3600)))
+        )
+
+    @staticmethod
+    def credentials_from_env():
+        """Return the extra accounts from INSTAGRAM_ACCOUNTS_FILE or INSTAGRAM_ACCOUNTS"""
+        path = os.getenv('INSTAGRAM_ACCOUNTS_FILE')
+        if path:
+            return load_accounts(path)
+        return parse_accounts(os.getenv('INSTAGRAM_ACCOUNTS', ''))
+
+    def _checkout(self):
+        """Pick the least-loaded healthy account, or the one leaving quarantine soonest"""
+        now = time.time()
+        with self._lock:
+            healthy = [account for account in self.accounts if account.available(now)]
+            if healthy:
+                account = min(healthy, key=lambda candidate: (
+                    candidate.inflight, candidate.client.rate_limiter.get_stats()["hourly_used"]
+                ))
+            else:
+                account = min(self.accounts, key=lambda candidate: candidate.quarantined_until)
+                logger.warning(f"All accounts are quarantined, using {account.username}")
+            account.inflight += 1
+            return account
+
+    def quarantine(self, account, reason, seconds):
+        with self._lock:
+            account.state = STATE_QUARANTINED
+            account.quarantined_until = max(account.quarantined_until, time.time() + seconds)
+            account.quarantine_reason = reason
+            account.stats["quarantines"] += 1
+        logger.warning(f"Quarantining account {account.username} for {seconds:.0f} seconds: {reason}")
+
+    def _extract_with(self, account, url, media, lane, fallback):
+        started = time.time()
+        try:
+            if lane is None:
+                content = account.client.extract_post_content(url, media=media, fallback=fallback)
+            else:
+                with account.client.rate_limiter.lane(lane):
+                    content = account.client.extract_post_content(url, media=media, fallback=fallback)
+        finally:
+            with self._lock:
+                account.inflight -= 1
+                account.stats["busy_seconds"] += time.time() - started
+
+        error_time, error = account.client.last_api_error or (0.0, None)
+        kind = self.classify_error(error) if error is not None and error_time >= started else None
+        if kind:
+            seconds = self.challenge_quarantine if kind == "challenge" else self.throttle_quarantine
+            self.quarantine(account, f"{type(error).__name__}: {error}", seconds)
+
+        with self._lock:
+            account.stats["extractions" if content else "failures"] += 1
+        return content, kind
+
+    def extract_post_content(self, url, media=None, lane=None, fallback=True):
+        """Extract with the least-loaded healthy account, moving on to another one if Instagram pushes back"""
+        content = None
+        account = None
+        for _ in range(len(self.accounts)):
+            account = self._checkout()
+            # Without fallback a throttled account returns None rather than placeholder content, so the post moves on
+            content, kind = self._extract_with(account, url, media, lane, False)
+            if content or not kind:
+                break
+            with self._lock:
+                if not any(other.available(time.time()) for other in self.accounts):
+                    break
+            logger.info(f"Retrying {url} with another account after {account.username} was quarantined")
+        if content is None and fallback and account is not None:
+            content = account.client.fallback_content(url)
+        return content
+
+    def get_stats(self):
+        """Return per-account state and throughput"""
+        uptime = time.time() - self.started
+        with self._lock:
+            return {account.username: account.as_dict(uptime) for account in self.accounts}
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Benchmarks
+Micro-benchmarks for the hot paths of the Python client, runnable without Instagram credentials
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import copy
+import tempfile
+import subprocess
+import tracemalloc
+
+from url_extractor import find_post_links
+from replay_client import ReplayClient, make_synthetic_fixtures, from_fixture
+from media_parser import parse_media
+from post_index import PostIndex
+
+SHORTCODE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+
+DM_TEMPLATES = [
+    "lol look at this {link}",
+    "{link}",
+    "omg 😂😂 ({link})",
+    "did you see this one?? {link} and also {link}",
+    "saving this for later: {link}.",
+    "ok so I was thinking about dinner tonight, maybe pasta? let me know what you think",
+    "haha yes",
+    "check the reel -> {link}!!",
+    "sent you a post earlier, here it is again \"{link}\"",
+    "not a post but https://www.instagram.com/someuser/ is great",
+    "link: <{link}>",
+]
+
+LINK_FORMS = [
+    "https://www.instagram.com/p/{code}/",
+    "https://www.instagram.com/reel/{code}/?igsh=MXRlZjZ5dW1hNnB6aQ==",
+    "https://instagram.com/reels/{code}",
+    "http://instagr.am/p/{code}/",
+    "instagram.com/p/{code}/?utm_source=ig_web_copy_link",
+    "https://www.instagram.com/tv/{code}/",
+    "https://m.instagram.com/someuser/p/{code}/#comments",
+]
+
+
+def make_dm_corpus(size=5000, seed=42):
+    """Build a reproducible list of DM-like texts mixing chatter and post links"""
+    rng = random.Random(seed)
+
+    def link():
+        code = ''.join(rng.choice(SHORTCODE_CHARS) for _ in range(11))
+        return rng.choice(LINK_FORMS).format(code=code)
+
+    corpus = []
+    for _ in range(size):
+        template = rng.choice(DM_TEMPLATES)
+        while '{link}' in template:
+            template = template.replace('{link}', link(), 1)
+        corpus.append(template)
+    return corpus
+
+
+def legacy_extract_urls(text):
+    """The whitespace-split scan extract_instagram_urls used before the compiled engine"""
+    urls = []
+    if text and 'instagram.com' in text:
+        for word in text.split():
+            if 'instagram.com' in word and ('/p/' in word or '/reel/' in word):
+                urls.append(word)
+    return urls
+
+
+def timed(function, items, repeat):
+    """Return the best per-item time in microseconds over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - started)
+    return best / len(items) * 1e6
+
+
+def bench_url_extraction(args):
+    repeat = args.repeat
+    corpus = make_dm_corpus()
+    found = sum(len(find_post_links(text)) for text in corpus)
+    legacy_found = sum(len(legacy_extract_urls(text)) for text in corpus)
+    return {
+        "messages": len(corpus),
+        "links_found": found,
+        "legacy_links_found": legacy_found,
+        "engine_us_per_message": round(timed(find_post_links, corpus, repeat), 3),
+        "legacy_us_per_message": round(timed(legacy_extract_urls, corpus, repeat), 3)
+    }
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+def measure(function, items):
+    """Call function on each item; return ops/sec, p50/p99 latency in ms and peak traced memory"""
+    samples = []
+    started = time.perf_counter()
+    for item in items:
+        call_started = time.perf_counter()
+        function(item)
+        samples.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    # Separate pass, tracemalloc slows the calls it traces
+    tracemalloc.start()
+    for item in items:
+        function(item)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "ops": len(items),
+        "ops_per_second": round(len(items) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+
+def load_fixtures(args):
+    if args.fixtures:
+        with open(args.fixtures, 'r') as fixture_file:
+            return json.load(fixture_file)
+    return make_synthetic_fixtures()
+
+
+def make_client(fixtures, args, workdir):
+    """Build an InstagramClient answered by a ReplayClient, with pacing lifted and state kept in workdir"""
+    os.environ['INSTAGRAM_PROCESSED_DB'] = os.path.join(workdir, 'processed_messages.db')
+    os.environ['INSTAGRAM_QUEUE_DB'] = os.path.join(workdir, 'work_queue.db')
+    # Recorded messages are older than the default pruning horizon, which would skip them as processed
+    os.environ['INSTAGRAM_PROCESSED_MAX_AGE_DAYS'] = '36500'
+    os.chdir(workdir)
+    # Imported late so the pure benchmarks run without instagrapi installed
+    from instagram_client import InstagramClient
+    from rate_limiter import RateLimiter, DEFAULT_ENDPOINT_LIMITS
+
+    unlimited = (10 ** 9, 10 ** 9)
+    limiter = RateLimiter(endpoint_limits={name: unlimited for name in DEFAULT_ENDPOINT_LIMITS},
+                          default_limit=unlimited, hourly_budget=10 ** 9)
+    replay = ReplayClient(fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=1)
+    client = InstagramClient("benchmark", "benchmark", rate_limiter=limiter, client=replay)
+    logging.getLogger().setLevel(args.log_level)
+    client.login()
+    return client
+
+
+def recorded_messages(fixtures):
+    return [from_fixture(item) for items in fixtures["calls"]["direct_messages"].values() for item in items]
+
+
+def bench_extract(args):
+    fixtures = load_fixtures(args)
+    from shortcode_codec import pk_to_shortcode
+    pks = [json.loads(key)[0][0] for key in fixtures["calls"]["media_info"]]
+    urls = [f"https://www.instagram.com/p/{pk_to_shortcode(pk)}/" for pk in pks]
+    home = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            client = make_client(fixtures, args, workdir)
+            return measure(client.extract_post_content, urls)
+        finally:
+            os.chdir(home)
+
+
+def bench_extract_urls(args):
+    fixtures = load_fixtures(args)
+    messages = recorded_messages(fixtures)
+    home = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            client = make_client(fixtures, args, workdir)
+            return measure(client.extract_instagram_urls, messages)
+        finally:
+            os.chdir(home)
+
+
+class CycleDone(BaseException):
+    """Raised from the poll wait to leave monitor_dms after one cycle (not caught by its handlers)"""
+
+
+def bench_monitor_cycle(args):
+    fixtures = load_fixtures(args)
+    message_count = len(recorded_messages(fixtures))
+    home = os.getcwd()
+    samples = []
+    peak = 0
+
+    def run_cycle(workdir):
+        client = make_client(fixtures, args, workdir)
+
+        def stop(delay, reason=None):
+            raise CycleDone()
+
+        client.wait_until_next_poll = stop
+        started = time.perf_counter()
+        try:
+            client.monitor_dms()
+        except CycleDone:
+            pass
+        # Include the extractions the cycle queued
+        while client.extraction_pool.pending():
+            client.extraction_pool.wait(1.0)
+            client.emit_extraction_results()
+            client.dispatch_queued_jobs()
+        elapsed = time.perf_counter() - started
+        client.extraction_pool.shutdown()
+        client.processed_messages.close()
+        client.work_queue.close()
+        return elapsed
+
+    try:
+        for index in range(args.repeat + 1):
+            with tempfile.TemporaryDirectory() as workdir:
+                if index == args.repeat:
+                    tracemalloc.start()
+                    run_cycle(workdir)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    samples.append(run_cycle(workdir))
+                os.chdir(home)
+    finally:
+        os.chdir(home)
+
+    return {
+        "cycles": len(samples),
+        "messages_per_cycle": message_count,
+        "messages_per_second": round(message_count / percentile(samples, 0.5), 1),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+
+def allocations(function, items):
+    """Return (retained blocks per item, peak traced KB) for parsing every item and keeping the results"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [function(item) for item in items]
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del results
+    return round(blocks / len(items), 1), round(peak / 1024, 1)
+
+
+def bench_media_parser(args):
+    """Compare the lean raw-JSON parser with instagrapi's Pydantic extract_media_v1 on media info responses"""
+    fixtures = load_fixtures(args)
+    items = [response["items"][0] for response in fixtures["calls"].get("private_request", {}).values()
+             if isinstance(response, dict) and response.get("items")]
+    if not items:
+        raise RuntimeError("The fixtures contain no raw media info responses")
+
+    result = {"media": len(items)}
+    result["lean_us_per_media"] = round(timed(parse_media, items, args.repeat), 3)
+    result["lean_blocks_per_media"], result["lean_peak_kb"] = allocations(parse_media, items)
+
+    try:
+        import instagram_client
+        instagram_client.load_instagrapi()
+    except ImportError:
+        result["pydantic_us_per_media"] = None
+        result["note"] = "instagrapi is not installed; only the lean parser was measured"
+        return result
+
+    # The patched extractor edits its input, so every run gets fresh copies (copied outside the timing)
+    def pydantic_run(batch):
+        return [instagram_client.patched_extract_media_v1(item) for item in batch]
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        batch = copy.deepcopy(items)
+        started = time.perf_counter()
+        parsed = pydantic_run(batch)
+        best = min(best, time.perf_counter() - started)
+    result["pydantic_us_per_media"] = round(best / len(items) * 1e6, 3)
+    result["pydantic_failures"] = sum(1 for media in parsed if media is None)
+    result["pydantic_blocks_per_media"], result["pydantic_peak_kb"] = allocations(
+        instagram_client.patched_extract_media_v1, copy.deepcopy(items))
+    return result
+
+
+CAPTION_WORDS = ("pasta recipe dinner quick easy healthy workout morning routine travel beach sunset city guide "
+                 "coffee review budget tips skincare outfit vintage music live concert coding tutorial python "
+                 "garden plants dog puppy cat design interior minimal family weekend market street food").split()
+
+
+def make_posts(count, seed=11):
+    """Build reproducible (shortcode, content) pairs shaped like extracted posts"""
+    rng = random.Random(seed)
+    posts = []
+    for index in range(count):
+        words = rng.choices(CAPTION_WORDS, k=rng.randint(5, 60))
+        tags = " ".join(f"#{word}" for word in rng.sample(CAPTION_WORDS, 3))
+        shortcode = ''.join(rng.choice(SHORTCODE_CHARS) for _ in range(11))
+        posts.append((shortcode, {
+            "username": f"creator{rng.randrange(5000)}",
+            "caption": f"{' '.join(words)} {tags} @friend{rng.randrange(2000)}",
+            "media_type": rng.choice(("PHOTO", "VIDEO", "CAROUSEL")),
+            "media_url": f"https://scontent.cdninstagram.com/v/{index}.jpg",
+            "image_urls": [],
+            "timestamp": f"2024-{index % 12 + 1:02d}-{index % 28 + 1:02d}T12:00:00",
+            "url": f"https://www.instagram.com/p/{shortcode}/",
+            "pk": str(10 ** 18 + index)
+        }))
+    return posts
+
+
+def bench_post_index(args):
+    """Bulk and single-post insert latency, then search and lookup latency, on an index of --index-posts posts"""
+    posts = make_posts(args.index_posts + 1000)
+    bulk, single = posts[:args.index_posts], posts[args.index_posts:]
+    with tempfile.TemporaryDirectory() as workdir:
+        index = PostIndex(os.path.join(workdir, 'post_index.db'))
+        started = time.perf_counter()
+        for offset in range(0, len(bulk), 1000):
+            index.add_many(bulk[offset:offset + 1000])
+        bulk_seconds = time.perf_counter() - started
+
+        # One transaction per post, as extractions write them
+        insert_samples = []
+        for shortcode, content in single:
+            call_started = time.perf_counter()
+            index.add(shortcode, content)
+            insert_samples.append(time.perf_counter() - call_started)
+
+        queries = {
+            "word": "pasta", "two_words": "healthy dinner", "prefix": "tutor*", "hashtag": "#travel",
+            "mention": "@friend42", "mixed": "coffee #review", "rare": "concert vintage garden puppy"
+        }
+        result = {
+            "posts": len(posts),
+            "bulk_insert_us_per_post": round(bulk_seconds / len(bulk) * 1e6, 2),
+            "insert_p50_ms": round(percentile(insert_samples, 0.5) * 1000, 3),
+            "insert_p99_ms": round(percentile(insert_samples, 0.99) * 1000, 3)
+        }
+        for name, query in queries.items():
+            samples = []
+            for _ in range(args.repeat * 4):
+                call_started = time.perf_counter()
+                index.search(query, limit=20)
+                samples.append(time.perf_counter() - call_started)
+            result[f"search_{name}_p50_ms"] = round(percentile(samples, 0.5) * 1000, 3)
+            result[f"search_{name}_p99_ms"] = round(percentile(samples, 0.99) * 1000, 3)
+
+        shortcodes = [shortcode for shortcode, _ in random.Random(3).sample(posts, 1000)]
+        result["lookup_us"] = round(timed(lambda shortcode: index.get(shortcode=shortcode), shortcodes, args.repeat), 2)
+        index.close()
+        result["db_mb"] = round(sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir)) / 2 ** 20, 1)
+    return result
+
+
+def bench_startup(args):
+    """Launch the extract CLI against replayed fixtures and time launch to first API request"""
+    fixtures = load_fixtures(args)
+    from shortcode_codec import pk_to_shortcode
+    pk = json.loads(next(iter(fixtures["calls"]["media_info"])))[0][0]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instagram_client.py')
+    env = {**os.environ, "INSTAGRAM_USERNAME": "benchmark", "INSTAGRAM_PASSWORD": "benchmark"}
+    first_request, module_import, total = [], [], []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fixture_path = os.path.join(workdir, 'fixtures.json')
+        with open(fixture_path, 'w') as fixture_file:
+            json.dump(fixtures, fixture_file)
+        command = [sys.executable, script, 'extract', '--url', f"https://www.instagram.com/p/{pk_to_shortcode(pk)}/",
+                   '--replay', fixture_path, '--no-cache', '--no-index', '--profile-startup', '--log-format', 'json']
+        for _ in range(args.repeat):
+            launched = time.time()
+            result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+            total.append(time.time() - launched)
+            for line in result.stderr.splitlines():
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("event") == "startup.profile" and event.get("first_api_request_at"):
+                    first_request.append(event["first_api_request_at"] - launched)
+                    module_import.append(event["module_import_seconds"])
+
+    if not first_request:
+        raise RuntimeError("The extract CLI did not report a startup profile")
+    return {
+        "runs": len(first_request),
+        "launch_to_first_request_p50_ms": round(percentile(first_request, 0.5) * 1000, 1),
+        "launch_to_first_request_p99_ms": round(percentile(first_request, 0.99) * 1000, 1),
+        "module_import_p50_ms": round(percentile(module_import, 0.5) * 1000, 1),
+        "process_p50_ms": round(percentile(total, 0.5) * 1000, 1)
+    }
+
+
+BENCHMARKS = {
+    "url-extraction": bench_url_extraction,
+    "extract": bench_extract,
+    "extract-urls": bench_extract_urls,
+    "monitor-cycle": bench_monitor_cycle,
+    "startup": bench_startup,
+    "media-parser": bench_media_parser,
+    "post-index": bench_post_index,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Instagram client micro-benchmarks')
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark (best or median is reported)')
+    parser.add_argument('--fixtures', help='Recorded fixture file (instagram_client.py --record); synthetic by default')
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected seconds per replayed API call')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Relative jitter applied to the injected latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of replayed API calls that fail')
+    parser.add_argument('--log-level', default='WARNING', help='Client log level while benchmarking')
+    parser.add_argument('--index-posts', type=int, default=200000, help='Posts loaded into the index for post-index')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    for name in args.names or BENCHMARKS:
+        result = BENCHMARKS[name](args)
+        print(json.dumps({"benchmark": name, **result}))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
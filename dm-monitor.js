@@ -7,6 +7,7 @@
 require('dotenv').config();
 const { spawn } = require('child_process');
 const chalk = require('chalk');
+const { RecordReader } = require('./record-reader');
 
 /**
  * Check if all required environment variables are set
@@ -40,41 +41,23 @@ async function startDMMonitoring() {
   console.log(chalk.blue('Send Instagram post/reel links to your bot account to process them automatically!'));
   console.log(chalk.gray('Press Ctrl+C to stop monitoring\n'));
   
-  const python = spawn('/Users/andreistan/instagram-bot/.venv/bin/python', ['instagram_client.py', 'monitor'], {
+  const outputFormat = process.env.INSTAGRAM_OUTPUT_FORMAT || 'ndjson';
+  const python = spawn('/Users/andreistan/instagram-bot/.venv/bin/python', ['instagram_client.py', 'monitor', '--output-format', outputFormat], {
     env: { ...process.env },
     stdio: ['inherit', 'pipe', 'inherit']
   });
   
-  python.stdout.on('data', async (data) => {
-    const output = data.toString().trim();
+  // stdout carries only framed records; Python diagnostics go straight to stderr
+  let processing = Promise.resolve();
+  const reader = new RecordReader(outputFormat, (record) => {
+    if (record.type !== 'content') {
+      return;
+    }
+    const content = record.data;
     
-    // Look for content extraction signals from Python
-    if (output.startsWith('CONTENT_EXTRACTED:')) {
+    // Process one post at a time, in the order they were extracted
+    processing = processing.then(async () => {
       try {
-        const contentJson = output.replace('CONTENT_EXTRACTED:', '').trim();
-        
-        // Try to parse JSON, with fallback for corrupted output
-        let content;
-        try {
-          content = JSON.parse(contentJson);
-        } catch (parseError) {
-          console.error(chalk.red(`❌ JSON parse error: ${parseError.message}`));
-          console.error(chalk.gray(`Raw JSON length: ${contentJson.length} characters`));
-          console.error(chalk.gray(`First 200 chars: ${contentJson.substring(0, 200)}...`));
-          console.error(chalk.gray(`Last 200 chars: ...${contentJson.substring(contentJson.length - 200)}`));
-          
-          // Try to extract basic info even from corrupted JSON
-          const usernameMatch = contentJson.match(/"username":\s*"([^"]+)"/);
-          const urlMatch = contentJson.match(/"url":\s*"([^"]+)"/);
-          
-          if (usernameMatch && urlMatch) {
-            console.log(chalk.yellow(`⚠️  Using extracted basic info: @${usernameMatch[1]} from ${urlMatch[1].substring(0, 50)}...`));
-            return; // Skip processing this corrupted content
-          } else {
-            throw parseError; // Re-throw if we can't extract anything
-          }
-        }
-        
         console.log(chalk.cyan(`\n📨 New Instagram content detected from @${content.username}`));
         console.log(chalk.gray(`Processing: ${content.url}`));
         console.log(chalk.blue(`Media type: ${content.media_type}, Images: ${content.image_urls ? content.image_urls.length : 0}\n`));
@@ -84,29 +67,15 @@ async function startDMMonitoring() {
         
       } catch (error) {
         console.error(chalk.red(`❌ Error processing extracted content: ${error.message}`));
-        console.error(chalk.gray(`Raw output length: ${output.length} characters`));
       }
-    } else if (output.includes('INFO') || output.includes('ERROR') || output.includes('WARNING')) {
-      // Log Python output for debugging with appropriate colors
-      if (output.includes('ERROR')) {
-        console.log(chalk.red(output));
-      } else if (output.includes('WARNING')) {
-        console.log(chalk.yellow(output));
-      } else {
-        console.log(chalk.gray(output));
-      }
-    } else if (output.includes('Processing new message:') || output.includes('Found Instagram URL') || output.includes('Successfully extracted')) {
-      // Important processing messages
-      console.log(chalk.blue(output));
-    } else if (output.includes('No Instagram URLs found') || output.includes('already processed')) {
-      // Less important messages
-      console.log(chalk.dim(output));
-    } else if (output.trim().length > 0 && !output.includes('Waiting')) {
-      // Other non-empty output
-      console.log(chalk.gray(output));
-    }
+    });
+  }, (error, frame) => {
+    console.error(chalk.red(`❌ Could not decode output record: ${error.message}`));
+    console.error(chalk.gray(`Record length: ${frame.length} bytes`));
   });
   
+  python.stdout.on('data', (data) => reader.push(data));
+  
   python.on('close', (code) => {
     if (code !== 0) {
       console.error(chalk.red(`\n❌ DM monitoring stopped with code ${code}`));
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Extraction Cache
+Persistent SQLite cache of extracted post content keyed by shortcode and media pk
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+def media_urls(content):
+    """Return the CDN URLs an extracted post links to"""
+    urls = list(content.get('image_urls') or [])
+    if content.get('media_url'):
+        urls.append(content['media_url'])
+    return urls
+
+
+def cdn_expiry(urls):
+    """Return the earliest 'oe' expiry timestamp found in Instagram CDN URLs, if any"""
+    expiries = []
+    for url in urls:
+        try:
+            oe = parse_qs(urlparse(url).query).get('oe')
+            if oe:
+                expiries.append(int(oe[0], 16))
+        except (ValueError, TypeError):
+            continue
+    return min(expiries) if expiries else None
+
+
+class ExtractionCache:
+    def __init__(self, path='extraction_cache.db', max_entries=5000,
+                 caption_ttl=7 * 24 * 3600, media_ttl=6 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.caption_ttl = caption_ttl
+        self.media_ttl = media_ttl
+        self.stats = {"hits": 0, "misses": 0, "stale_media": 0, "evictions": 0, "writes": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS extractions (
+                shortcode TEXT PRIMARY KEY,
+                pk TEXT,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                caption_expires_at REAL NOT NULL,
+                media_expires_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_pk ON extractions (pk)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_access ON extractions (last_access)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured from INSTAGRAM_CACHE_* environment variables"""
+        return cls(
+            path=os.getenv('INSTAGRAM_CACHE_PATH', 'extraction_cache.db'),
+            max_entries=int(os.getenv('INSTAGRAM_CACHE_MAX_ENTRIES', '5000')),
+            caption_ttl=float(os.getenv('INSTAGRAM_CACHE_CAPTION_TTL', str(7 * 24 * 3600))),
+            media_ttl=float(os.getenv('INSTAGRAM_CACHE_MEDIA_TTL', str(6 * 3600)))
+        )
+
+    def get(self, shortcode=None, pk=None, require_media=True):
+        """Return cached content for a shortcode or pk, or None on a miss"""
+        if not shortcode and not pk:
+            return None
+
+        now = time.time()
+        with self._lock:
+            if shortcode:
+                row = self._conn.execute(
+                    "SELECT shortcode, content, caption_expires_at, media_expires_at FROM extractions WHERE shortcode = ?",
+                    (shortcode,)
+                ).fetchone()
+            else:
+                row = None
+            if row is None and pk:
+                row = self._conn.execute(
+                    "SELECT shortcode, content, caption_expires_at, media_expires_at FROM extractions WHERE pk = ?",
+                    (str(pk),)
+                ).fetchone()
+
+            if row is None or row[2] <= now:
+                self.stats["misses"] += 1
+                return None
+
+            content = json.loads(row[1])
+            if row[3] <= now:
+                self.stats["stale_media"] += 1
+                if require_media:
+                    self.stats["misses"] += 1
+                    return None
+                # Expired CDN links are useless, so only the caption side is served
+                content = {**content, "media_url": "", "image_urls": [], "images": []}
+
+            self._conn.execute("UPDATE extractions SET last_access = ? WHERE shortcode = ?", (now, row[0]))
+            self._conn.commit()
+            self.stats["hits"] += 1
+            return content
+
+    def put(self, shortcode, content):
+        """Store extracted content and evict the least recently used entries over the cap"""
+        now = time.time()
+        media_expires_at = now + self.media_ttl
+        expiry = cdn_expiry(media_urls(content))
+        if expiry:
+            media_expires_at = min(media_expires_at, expiry)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (shortcode, str(content.get('pk', '')), json.dumps(content, ensure_ascii=False),
+                 now, now, now + self.caption_ttl, media_expires_at)
+            )
+            self.stats["writes"] += 1
+
+            count = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM extractions WHERE shortcode IN "
+                    "(SELECT shortcode FROM extractions ORDER BY last_access ASC LIMIT ?)",
+                    (excess,)
+                )
+                self.stats["evictions"] += excess
+            self._conn.commit()
+
+    def get_stats(self):
+        """Return hit/miss counters along with the current size"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": size,
+            "max_entries": self.max_entries,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Extraction Pool
+Bounded worker pool that runs extractions concurrently and hands results back in order per thread
+"""
+
+import logging
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionPool:
+    def __init__(self, extract, max_workers=4):
+        self.extract = extract
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='extract')
+        self._queues = OrderedDict()
+        self._condition = threading.Condition()
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def _on_done(self, future):
+        with self._condition:
+            self.stats["completed"] += 1
+            if future.exception() is not None:
+                self.stats["failed"] += 1
+            self._condition.notify_all()
+
+    def submit(self, key, url, context=None, **kwargs):
+        """Queue an extraction; results for the same key are released in submission order"""
+        future = self._executor.submit(self.extract, url, **kwargs)
+        with self._condition:
+            self._queues.setdefault(key, deque()).append((url, context, future))
+            self.stats["submitted"] += 1
+        future.add_done_callback(self._on_done)
+        return future
+
+    def pending(self):
+        """Return the number of extractions not yet handed back"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def wait(self, timeout):
+        """Block until some extraction finishes or the timeout elapses"""
+        with self._condition:
+            if not any(queue and queue[0][2].done() for queue in self._queues.values()):
+                self._condition.wait(timeout)
+
+    def ready(self):
+        """Pop finished results as (url, context, content, error), preserving per-key order"""
+        results = []
+        with self._condition:
+            for key in list(self._queues):
+                queue = self._queues[key]
+                while queue and queue[0][2].done():
+                    url, context, future = queue.popleft()
+                    error = future.exception()
+                    results.append((url, context, None if error else future.result(), error))
+                if not queue:
+                    del self._queues[key]
+        return results
+
+    def get_stats(self):
+        """Return submission/completion counters and the current backlog"""
+        return {
+            **self.stats,
+            "pending": self.pending(),
+            "max_workers": self.max_workers
+        }
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and optionally wait for running extractions"""
+        self._executor.shutdown(wait=wait)
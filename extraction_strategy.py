@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Extraction Strategy
+Orders media fetch methods by their observed success rate and latency, optionally racing the top two
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class MethodStats:
+    def __init__(self, name):
+        self.name = name
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+        self.avg_latency = None
+        self.last_error = None
+
+    def record(self, latency, error=None, alpha=0.2):
+        """Record one attempt, updating the moving average latency"""
+        self.attempts += 1
+        if error is None:
+            self.successes += 1
+        else:
+            self.failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+        self.avg_latency = latency if self.avg_latency is None else (1 - alpha) * self.avg_latency + alpha * latency
+
+    @property
+    def success_rate(self):
+        # Laplace smoothing keeps untried methods in contention
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def expected_cost(self, default_latency):
+        """Seconds per successful fetch, lower is better"""
+        latency = self.avg_latency if self.avg_latency is not None else default_latency
+        return latency / self.success_rate
+
+    def as_dict(self):
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "wins": self.wins,
+            "success_rate": round(self.success_rate, 3),
+            "avg_latency": round(self.avg_latency, 3) if self.avg_latency is not None else None,
+            "last_error": self.last_error
+        }
+
+
+class StrategyEngine:
+    def __init__(self, methods, race=False, race_deadline=10.0, default_latency=1.0, callers=1, serialized=False):
+        self.methods = dict(methods)
+        self.order = list(self.methods)
+        if race and serialized:
+            # Methods that queue on one client cannot overlap, so a race only spends twice the API calls
+            logger.warning("Racing extraction methods is disabled: they share one serialized client")
+            race = False
+        self.race = race
+        self.race_deadline = race_deadline
+        self.default_latency = default_latency
+        self.stats = {name: MethodStats(name) for name in self.methods}
+        self._lock = threading.Lock()
+        # Each concurrent caller races two methods at once, so one caller never queues behind another's race
+        self._executor = ThreadPoolExecutor(max_workers=2 * max(1, callers), thread_name_prefix='race') if race else None
+
+    def ranked(self):
+        """Return method names best first; ties keep the configured order"""
+        with self._lock:
+            return sorted(self.order, key=lambda name: (
+                self.stats[name].expected_cost(self.default_latency), self.order.index(name)
+            ))
+
+    def _attempt(self, name, *args):
+        started = time.monotonic()
+        try:
+            result = self.methods[name](*args)
+            if result is None:
+                raise ValueError("No media info returned")
+        except Exception as e:
+            with self._lock:
+                self.stats[name].record(time.monotonic() - started, e)
+            raise
+        with self._lock:
+            self.stats[name].record(time.monotonic() - started)
+        return result
+
+    def _race(self, names, *args):
+        """Run two methods at once and return the first success within the deadline"""
+        futures = {self._executor.submit(self._attempt, name, *args): name for name in names}
+        deadline = time.monotonic() + self.race_deadline
+        pending = set(futures)
+        errors = []
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    # Threads can't be interrupted; the loser is cancelled if queued, otherwise ignored
+                    for other in pending:
+                        other.cancel()
+                    return future.result(), futures[future]
+                errors.append(future.exception())
+        raise errors[-1] if errors else TimeoutError(f"No method finished within {self.race_deadline}s")
+
+    def fetch(self, *args):
+        """Try methods best first; returns (result, method_name) or raises the last error"""
+        ranked = self.ranked()
+        last_error = None
+
+        if self.race and len(ranked) > 1:
+            try:
+                result, name = self._race(ranked[:2], *args)
+                self._record_win(name)
+                return result, name
+            except Exception as e:
+                logger.warning(f"Raced methods {ranked[:2]} failed: {e}")
+                last_error = e
+            ranked = ranked[2:]
+
+        for name in ranked:
+            try:
+                result = self._attempt(name, *args)
+                self._record_win(name)
+                return result, name
+            except Exception as e:
+                logger.warning(f"Extraction method '{name}' failed: {e}")
+                last_error = e
+
+        raise last_error or ValueError("No extraction methods configured")
+
+    def _record_win(self, name):
+        with self._lock:
+            self.stats[name].wins += 1
+
+    def get_stats(self):
+        """Return per-method stats and the current ranking"""
+        ranking = self.ranked()
+        with self._lock:
+            return {
+                "ranking": ranking,
+                "race": self.race,
+                "methods": {name: stats.as_dict() for name, stats in self.stats.items()}
+            }
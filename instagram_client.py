@@ -4,19 +4,58 @@ Instagram Client using instagrapi
 Handles Instagram operations including DM monitoring and content extraction
 """
 
+import io
 import os
 import json
 import sys
 import time
+
+# Reference point for --profile-startup
+MODULE_START = time.perf_counter()
+
 import logging
+import atexit
+import threading
 from datetime import datetime
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired, ChallengeRequired, PleaseWaitFewMinutes
-from instagrapi.extractors import extract_media_v1
 import argparse
+from extraction_cache import ExtractionCache, cdn_expiry, media_urls
+from post_index import PostIndex
+from message_store import ProcessedMessageStore, to_epoch
+from extraction_pool import ExtractionPool
+from work_queue import WorkQueue, STATE_DEAD
+from rate_limiter import RateLimiter, LANE_BACKFILL
+from poll_scheduler import PollScheduler
+from structured_log import configure_logging, log_event, debug_dump
+from extraction_strategy import StrategyEngine
+from shortcode_codec import shortcode_to_pk, pk_to_shortcode, shortcodes_to_pks
+from url_extractor import find_post_links, parse_post_url, canonical_url
+from rendition_selector import RenditionSelector
+from output_channel import RecordWriter, FORMATS
+from metrics import Metrics
+from replay_client import RecordingClient, ReplayClient
+from account_pool import AccountPool
+from session_manager import SessionManager
+from media_parser import parse_media_info
+
+
+class InstagrapiNotLoaded(Exception):
+    """Stands in for instagrapi exception classes until instagrapi is imported; never raised"""
+
+
+# instagrapi (and its Pydantic models) are imported on first use by load_instagrapi()
+Client = None
+extract_media_v1 = None
+LoginRequired = ChallengeRequired = PleaseWaitFewMinutes = ClientThrottledError = InstagrapiNotLoaded
+
+startup_profile = {
+    "module_import_seconds": None,
+    "instagrapi_import_seconds": None,
+    "first_api_request_seconds": None,
+    "first_api_request_at": None
+}
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configure logging (diagnostics go to stderr; stdout is reserved for results)
+configure_logging(os.getenv('INSTAGRAM_LOG_FORMAT', 'text'), os.getenv('INSTAGRAM_LOG_LEVEL', 'INFO'))
 logger = logging.getLogger(__name__)
 
 # Patch for instagrapi validation error with clips_metadata.original_sound_info
@@ -65,72 +104,240 @@ def patched_extract_media_v1(media):
         logger.debug(f"Failed to extract media, skipping: {e}")
         return None
 
-# Monkey patch the extractor
-import instagrapi.extractors
-instagrapi.extractors.extract_media_v1 = patched_extract_media_v1
+def load_instagrapi():
+    """Import instagrapi and patch its extractor once, on the first call that needs it"""
+    global Client, extract_media_v1, LoginRequired, ChallengeRequired, PleaseWaitFewMinutes, ClientThrottledError
+    if Client is None:
+        started = time.perf_counter()
+        import instagrapi
+        import instagrapi.extractors
+        from instagrapi import exceptions
+        extract_media_v1 = instagrapi.extractors.extract_media_v1
+        LoginRequired = exceptions.LoginRequired
+        ChallengeRequired = exceptions.ChallengeRequired
+        PleaseWaitFewMinutes = exceptions.PleaseWaitFewMinutes
+        ClientThrottledError = exceptions.ClientThrottledError
+        # Monkey patch the extractor
+        instagrapi.extractors.extract_media_v1 = patched_extract_media_v1
+        Client = instagrapi.Client
+        startup_profile["instagrapi_import_seconds"] = round(time.perf_counter() - started, 4)
+    return Client
+
+def mark_api_request():
+    """Record how long after startup the first Instagram request was made"""
+    if startup_profile["first_api_request_seconds"] is None:
+        startup_profile["first_api_request_seconds"] = round(time.perf_counter() - MODULE_START, 4)
+        startup_profile["first_api_request_at"] = time.time()
+
+def classify_api_error(error):
+    """Return "challenge" or "throttle" for errors that should take an account out of rotation"""
+    if isinstance(error, ChallengeRequired):
+        return "challenge"
+    if is_throttle_error(error):
+        return "throttle"
+    return None
+
+def is_throttle_error(error):
+    """Check whether an exception is Instagram asking us to slow down"""
+    if isinstance(error, (PleaseWaitFewMinutes, ClientThrottledError)):
+        return True
+    message = str(error).lower()
+    return 'please wait a few minutes' in message or '429' in message or 'too many requests' in message
 
 class InstagramClient:
-    def __init__(self, username, password):
-        self.client = Client()
+    def __init__(self, username, password, cache=None, rate_limiter=None, downloader=None, metrics=None, client=None,
+                 index=None):
+        # client lets a RecordingClient or ReplayClient stand in for instagrapi
+        self._client = client
+        # The instagrapi client is not thread-safe (private_request hands back the shared last_json and
+        # session cookies are mutated per request), so workers take turns calling it
+        self._api_lock = threading.RLock()
         self.username = username
         self.password = password
         self.logged_in = False
-        self.processed_messages = set()
-        self.load_processed_messages()
+        # Only the monitor needs the processed message store; it is opened there
+        self.processed_messages = None
+        self._last_prune_time = 0
+        self.cache = cache
+        # Permanent full-text index of every extracted post (see post_index.py)
+        self.index = index
+        # Per-stage latency histograms and counters (served on /metrics when enabled)
+        self.metrics = metrics or Metrics()
+        # Extra bot accounts that share extraction load (see account_pool.py)
+        self.account_pool = None
+        self.last_api_error = None
+        # Framed stdout channel for extracted content (set by the monitor action)
+        self.output = None
+        # One image rendition per logical image (INSTAGRAM_IMAGE_RENDITION)
+        self.renditions = RenditionSelector.from_env()
+        # Optional download stage that turns expiring CDN links into local files
+        self.downloader = downloader
+        # Every instagrapi call is paced through this limiter
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        self.extraction_pool = None
+        # Durable queue between URL discovery and extraction (opened by the monitor)
+        self.work_queue = None
+        self._job_media = {}
+        self._monitor_callback = None
+        self.scheduler = None
         self._login_time = None
+        self._last_success_time = None
+        # Trust the session for this many seconds after the last successful API call
+        self.session_ttl = float(os.getenv('INSTAGRAM_SESSION_TTL', '1800'))
+        # Warm starts from the saved session, serialized re-logins and background refresh
+        self.sessions = SessionManager.from_env(self)
+        # Media fetch methods, ordered at runtime by observed success rate and latency
+        methods = {
+            "raw": self._fetch_raw,
+            "code": self._fetch_by_code,
+            "v1": self._fetch_v1
+        }
+        enabled = [name.strip() for name in os.getenv('INSTAGRAM_EXTRACT_METHODS', 'raw,code,v1').split(',') if name.strip() in methods]
+        self.strategy = StrategyEngine(
+            {name: methods[name] for name in enabled or methods},
+            race=os.getenv('INSTAGRAM_EXTRACT_RACE', '0') == '1',
+            race_deadline=float(os.getenv('INSTAGRAM_EXTRACT_RACE_DEADLINE', '10')),
+            callers=int(os.getenv('INSTAGRAM_EXTRACT_WORKERS', '4')),
+            # Every method goes through self.client under _api_lock
+            serialized=True
+        )
         
-    def is_login_valid(self):
-        """Check if current session is still valid"""
+        # Incremental DM sync settings
+        self.dm_thread_amount = int(os.getenv('INSTAGRAM_DM_THREADS', '20'))
+        self.dm_page_size = int(os.getenv('INSTAGRAM_DM_PAGE_SIZE', '10'))
+        self.dm_max_messages = int(os.getenv('INSTAGRAM_DM_MAX_MESSAGES', '100'))
+        self.poll_stats = {
+            "threads_checked": 0,
+            "threads_skipped": 0,
+            "message_pages": 0,
+            "messages_fetched": 0
+        }
+        self.session_stats = {
+            "checks_skipped": 0,
+            "checks_performed": 0,
+            "checks_failed": 0,
+            "relogins": 0
+        }
+        
+    @property
+    def client(self):
+        """The instagrapi Client, created (and instagrapi imported) on first use"""
+        if self._client is None:
+            self._client = load_instagrapi()()
+        return self._client
+    
+    def is_login_valid(self, force=False):
+        """Check if current session is still valid; force always asks Instagram"""
         if not self.logged_in:
             return False
+        
+        # Skip the live check while the session was recently proven to work
+        last_seen = self._last_success_time or self._login_time
+        if not force and last_seen and time.time() - last_seen < self.session_ttl:
+            self.session_stats["checks_skipped"] += 1
+            return True
             
+        self.session_stats["checks_performed"] += 1
         try:
             # Simple API call to test if session is valid
-            user_info = self.client.user_info_by_username(self.username)
-            return user_info is not None
+            mark_api_request()
+            self.rate_limiter.acquire('user_info_by_username')
+            with self._api_lock, self.metrics.timer("stage_seconds", stage="login_check"):
+                user_info = self.client.user_info_by_username(self.username)
+            if user_info is not None:
+                self._last_success_time = time.time()
+                return True
         except Exception:
-            return False
+            pass
+        
+        self.session_stats["checks_failed"] += 1
+        return False
     
-    def load_processed_messages(self):
-        """Load previously processed message IDs from file"""
+    def invalidate_session(self):
+        """Forget cached session validity so the next check or call logs in again"""
+        self.logged_in = False
+        self._last_success_time = None
+    
+    def call_api(self, method, *args, **kwargs):
+        """Call an instagrapi method, re-logging in once if the session turns out to be invalid"""
+        started = time.time()
         try:
-            with open('processed_messages.json', 'r') as f:
-                self.processed_messages = set(json.load(f))
-        except FileNotFoundError:
-            self.processed_messages = set()
+            result = self._limited_call(method, *args, **kwargs)
+        except LoginRequired:
+            # Workers share one session, so only the first to notice logs in again
+            logger.warning(f"Session rejected during {method.__name__}, logging in again...")
+            if not self.sessions.relogin(since=started):
+                raise
+            result = self._limited_call(method, *args, **kwargs)
+        
+        self._last_success_time = time.time()
+        return result
+    
+    def _limited_call(self, method, *args, **kwargs):
+        """Call an instagrapi method once it is allowed by the rate limiter"""
+        endpoint = method.__name__
+        mark_api_request()
+        waited = self.rate_limiter.acquire(endpoint)
+        if waited:
+            self.metrics.observe("stage_seconds", waited, stage="rate_limit_wait")
+        try:
+            # Waiting for the rate limiter above happens outside the lock
+            lock_started = time.perf_counter()
+            with self._api_lock:
+                self.metrics.observe("stage_seconds", time.perf_counter() - lock_started, stage="api_lock_wait")
+                with self.metrics.timer("stage_seconds", stage=f"api.{endpoint}"):
+                    return method(*args, **kwargs)
+        except Exception as e:
+            self.last_api_error = (time.time(), e)
+            if is_throttle_error(e):
+                self.rate_limiter.penalize(endpoint)
+            raise
+    
+    def get_session_stats(self):
+        """Return session health counters and timings"""
+        now = time.time()
+        return {
+            **self.session_stats,
+            "logged_in": self.logged_in,
+            "session_ttl": self.session_ttl,
+            "session_age": now - self._login_time if self._login_time else None,
+            "since_last_success": now - self._last_success_time if self._last_success_time else None,
+            **self.sessions.get_stats()
+        }
+    
+    def load_processed_messages(self):
+        """Open the processed message store (migrating processed_messages.json on first use)"""
+        self.processed_messages = ProcessedMessageStore.from_env()
     
     def save_processed_messages(self):
-        """Save processed message IDs to file"""
-        with open('processed_messages.json', 'w') as f:
-            json.dump(list(self.processed_messages), f)
+        """Commit processed message IDs and prune old entries about once a day"""
+        self.processed_messages.flush()
+        if time.time() - self._last_prune_time > 86400:
+            self.processed_messages.prune()
+            if self.work_queue:
+                self.work_queue.prune()
+            self._last_prune_time = time.time()
     
     def login(self):
-        """Login to Instagram with improved session management"""
+        """Use the saved session if there is one, otherwise log in with credentials and save the session"""
         try:
-            session_file = f"{self.username}_session.json"
-            
-            # Try to load existing session first
-            if os.path.exists(session_file):
-                try:
-                    logger.info("Loading existing session...")
-                    self.client.load_settings(session_file)
-                    self.client.login(self.username, self.password)
-                    self.logged_in = True
-                    logger.info(f"Successfully logged in using existing session for {self.username}")
-                    return True
-                except Exception as session_error:
-                    logger.warning(f"Existing session failed: {session_error}")
-                    logger.info("Creating new session...")
-                    # Remove corrupted session file
-                    os.remove(session_file)
-            else:
-                logger.info("No existing session found, creating new session...")
+            # Warm start: the saved session is used as is; a rejected call logs in again through call_api
+            with self._api_lock:
+                restored = self.sessions.restore()
+            if restored:
+                self.logged_in = True
+                self._login_time = time.time()
+                logger.info(f"Restored saved session for {self.username} without logging in")
+                return True
             
-            # Create new session if no existing session or it failed
-            self.client.login(self.username, self.password)
-            self.client.dump_settings(session_file)
+            logger.info(f"Logging in {self.username} with credentials...")
+            mark_api_request()
+            # Other workers may be mid-request on this client; log in between their calls
+            with self._api_lock:
+                self.sessions.login()
             
             self.logged_in = True
+            self._login_time = time.time()
             logger.info(f"Successfully logged in with new session for {self.username}")
             return True
             
@@ -139,38 +346,80 @@ class InstagramClient:
             return False
         except ChallengeRequired as e:
             logger.error(f"Challenge required: {e}")
+            self.last_api_error = (time.time(), e)
             return False
-        except PleaseWaitFewMinutes:
+        except PleaseWaitFewMinutes as e:
             logger.error("Instagram asked to wait - trying again later")
+            self.last_api_error = (time.time(), e)
             return False
         except Exception as e:
             logger.error(f"Login failed: {e}")
             return False
     
+    def fetch_new_messages(self, thread):
+        """Return the thread's messages newer than its sync cursor, oldest first"""
+        thread_id = str(thread.id)
+        cursor = self.processed_messages.get_thread_cursor(thread_id)
+        last_activity = to_epoch(getattr(thread, 'last_activity_at', None))
+        
+        # Unchanged threads cost nothing beyond the thread list itself
+        if cursor and cursor["last_activity_at"] is not None and last_activity is not None:
+            if last_activity <= cursor["last_activity_at"]:
+                self.poll_stats["threads_skipped"] += 1
+                return []
+        self.poll_stats["threads_checked"] += 1
+        
+        def reaches_cursor(messages):
+            if not cursor:
+                return bool(messages)
+            oldest = messages[-1] if messages else None
+            if oldest is None:
+                return False
+            if cursor["last_item_id"] and str(oldest.id) == cursor["last_item_id"]:
+                return True
+            oldest_ts = to_epoch(getattr(oldest, 'timestamp', None))
+            return cursor["last_item_ts"] is not None and oldest_ts is not None and oldest_ts <= cursor["last_item_ts"]
+        
+        # Threads carry their latest items, which usually already cover everything new
+        messages = list(getattr(thread, 'messages', None) or [])
+        amount = len(messages)
+        exhausted = False
+        while not reaches_cursor(messages) and not exhausted:
+            if amount >= self.dm_max_messages:
+                logger.warning(f"Thread {thread_id} has more than {self.dm_max_messages} new messages, older ones are skipped")
+                break
+            amount = min(max(amount * 2, self.dm_page_size), self.dm_max_messages)
+            messages = list(self.call_api(self.client.direct_messages, thread_id, amount=amount))
+            self.poll_stats["message_pages"] += 1
+            exhausted = len(messages) < amount
+        
+        since = cursor["last_item_ts"] if cursor else None
+        new_messages = [
+            message for message in messages
+            if since is None or to_epoch(getattr(message, 'timestamp', None)) is None
+            or to_epoch(message.timestamp) >= since
+        ]
+        new_messages.sort(key=lambda message: to_epoch(getattr(message, 'timestamp', None)) or 0)
+        self.poll_stats["messages_fetched"] += len(new_messages)
+        return new_messages
+    
+    def advance_thread_cursor(self, thread, messages):
+        """Record how far a thread has been synced"""
+        newest = messages[-1] if messages else None
+        self.processed_messages.set_thread_cursor(
+            thread.id,
+            last_activity_at=getattr(thread, 'last_activity_at', None),
+            last_item_id=newest.id if newest else None,
+            last_item_ts=getattr(newest, 'timestamp', None) if newest else None
+        )
+    
     def clean_instagram_url(self, raw_url):
         """Clean and validate Instagram URL from various formats"""
         try:
-            # Handle string representation of complex objects
-            if isinstance(raw_url, str):
-                # Extract URL from metadata string if present
-                if 'text=' in raw_url:
-                    import re
-                    url_match = re.search(r"text='([^']+)'", raw_url)
-                    if url_match:
-                        raw_url = url_match.group(1)
-                
-                # Remove URL parameters that might cause issues
-                if '?' in raw_url:
-                    clean_url = raw_url.split('?')[0]
-                else:
-                    clean_url = raw_url
-                
-                # Validate it's an Instagram URL
-                if 'instagram.com' in clean_url and ('/p/' in clean_url or '/reel/' in clean_url):
-                    # Ensure it ends with /
-                    if not clean_url.endswith('/'):
-                        clean_url += '/'
-                    return clean_url
+            # Also finds links inside metadata reprs like "text='https://...'" and drops tracking parameters
+            link = parse_post_url(raw_url)
+            if link:
+                return canonical_url(*link)
             
             logger.warning(f"Could not clean URL: {raw_url}")
             return str(raw_url)
@@ -179,553 +428,856 @@ class InstagramClient:
             logger.error(f"Error cleaning URL: {e}")
             return str(raw_url)
     
-    def extract_post_content(self, url):
-        """Extract content from Instagram post/reel URL"""
+    def normalize_media(self, media_info, url, shortcode):
+        """Build the content dict from an instagrapi Media object; returns (content, complete)"""
+        # Safely extract information with fallbacks
+        try:
+            username = media_info.user.username if hasattr(media_info, 'user') and media_info.user else "unknown"
+            caption = media_info.caption_text if hasattr(media_info, 'caption_text') else ""
+            
+            # Handle media type extraction safely
+            media_type = "UNKNOWN"
+            if hasattr(media_info, 'media_type'):
+                if hasattr(media_info.media_type, 'name'):
+                    media_type = media_info.media_type.name
+                elif isinstance(media_info.media_type, str):
+                    media_type = media_info.media_type
+                elif isinstance(media_info.media_type, int):
+                    # Map integer types to names
+                    type_mapping = {1: "PHOTO", 2: "VIDEO", 8: "CAROUSEL"}
+                    media_type = type_mapping.get(media_info.media_type, "UNKNOWN")
+            
+            # Handle media URL and image extraction safely
+            media_url = ""
+            images = []
+            
+            # Extract video URL if available
+            if hasattr(media_info, 'video_url') and media_info.video_url:
+                media_url = str(media_info.video_url)
+            
+            # Handle carousel posts (multiple images) - CHECK THIS FIRST
+            if hasattr(media_info, 'resources') and media_info.resources:
+                logger.info(f"Found carousel with {len(media_info.resources)} resources")
+                carousel_images = []
+                for i, resource in enumerate(media_info.resources):
+                    try:
+                        # Method 1: image_versions2 (standard), one rendition per item
+                        if hasattr(resource, 'image_versions2') and resource.image_versions2:
+                            selected = self.renditions.select(getattr(resource.image_versions2, 'candidates', None))
+                            if selected:
+                                carousel_images.append(selected)
+                                continue
+                        
+                        # Method 2: thumbnail_url (works for most carousels)
+                        if hasattr(resource, 'thumbnail_url') and resource.thumbnail_url:
+                            carousel_images.append(self._unsized_image(resource.thumbnail_url))
+                            continue
+                        
+                        # Method 3: display_url
+                        if hasattr(resource, 'display_url') and resource.display_url:
+                            carousel_images.append(self._unsized_image(resource.display_url))
+                            continue
+                    
+                    except Exception as resource_error:
+                        logger.error(f"Error processing carousel resource {i+1}: {resource_error}")
+                
+                if carousel_images:
+                    images = carousel_images  # Use carousel images as primary images
+                    logger.info(f"Successfully extracted {len(carousel_images)} carousel images")
+                else:
+                    logger.warning("No carousel images extracted despite finding resources")
+            
+            # If not a carousel, pick one rendition of the single post image
+            elif hasattr(media_info, 'image_versions2') and media_info.image_versions2:
+                selected = self.renditions.select(getattr(media_info.image_versions2, 'candidates', None))
+                if selected:
+                    images.append(selected)
+                    logger.info(f"Selected {selected['width']}x{selected['height']} rendition for single post")
+            
+            # If no specific media URL and we have images, use first image
+            if not media_url and images:
+                media_url = images[0]["url"]
+            
+            # Fallback image URL extraction
+            if not images:
+                if hasattr(media_info, 'thumbnail_url') and media_info.thumbnail_url:
+                    images.append(self._unsized_image(media_info.thumbnail_url))
+                elif hasattr(media_info, 'display_url') and media_info.display_url:
+                    images.append(self._unsized_image(media_info.display_url))
+            
+            # Remove duplicates while preserving order
+            images = list({image["url"]: image for image in images}.values())
+            image_urls = [image["url"] for image in images]
+            
+            timestamp = media_info.taken_at.isoformat() if hasattr(media_info, 'taken_at') and media_info.taken_at else datetime.now().isoformat()
+            pk = str(media_info.pk) if hasattr(media_info, 'pk') else shortcode
+            complete = True
+        
+        except Exception as extract_error:
+            logger.error(f"Error extracting media fields: {extract_error}")
+            # Return basic structure even if extraction fails
+            username = "unknown"
+            caption = f"Content from {url}"
+            media_type = "UNKNOWN"
+            media_url = ""
+            images = []
+            image_urls = []
+            timestamp = datetime.now().isoformat()
+            pk = shortcode
+            complete = False
+        
+        # Extract relevant information
+        content = {
+            "username": username,
+            "caption": caption or "",
+            "media_type": media_type,
+            "media_url": media_url,
+            "image_urls": image_urls,  # New field for image URLs
+            "images": images,  # One {"url", "width", "height"} per image
+            "timestamp": timestamp,
+            "url": url,  # Use the original clean URL
+            "pk": pk
+        }
+        
+        return content, complete
+    
+    @staticmethod
+    def _unsized_image(url):
+        return {"url": str(url), "width": None, "height": None}
+    
+    def media_share_shortcode(self, media):
+        """Return the shortcode of a shared media object without any API calls"""
+        code = getattr(media, 'code', None)
+        if code:
+            return code
+        
+        # DM payloads sometimes only carry pk or "pk_userid" style ids
+        media_pk = getattr(media, 'pk', None) or str(getattr(media, 'id', None) or '').split('_')[0]
+        if media_pk and str(media_pk).isdigit():
+            return pk_to_shortcode(media_pk)
+        return None
+    
+    def has_embedded_media(self, media):
+        """Check whether a shared media object already carries the fields normalize_media needs"""
+        user = getattr(media, 'user', None)
+        if not user or not getattr(user, 'username', None) or not getattr(media, 'pk', None):
+            return False
+        return bool(
+            getattr(media, 'video_url', None) or getattr(media, 'resources', None)
+            or getattr(media, 'image_versions2', None) or getattr(media, 'thumbnail_url', None)
+        )
+    
+    def _fetch_raw(self, media_pk, lane):
+        """Lean method: the private API media info JSON, parsed without building instagrapi models"""
+        with self.rate_limiter.lane(lane):
+            response = self.call_api(self.media_info_raw, str(media_pk))
+        with self.metrics.timer("stage_seconds", stage="parse"):
+            return parse_media_info(response)
+    
+    def media_info_raw(self, media_pk):
+        """GET media/{pk}/info/ and return the decoded JSON as is"""
+        return self.client.private_request(f"media/{media_pk}/info/")
+    
+    def _fetch_by_code(self, media_pk, lane):
+        """Primary method: media_info, which tries the public then the private API"""
+        with self.rate_limiter.lane(lane):
+            return self.call_api(self.client.media_info, str(media_pk))
+    
+    def _fetch_v1(self, media_pk, lane):
+        """Fallback: the private API media_info_v1 endpoint"""
+        with self.rate_limiter.lane(lane):
+            return self.call_api(self.client.media_info_v1, str(media_pk))
+    
+    def _with_local_media(self, content):
+        """Download the content's media when a downloader is configured"""
+        if self.downloader:
+            try:
+                self.downloader.attach(content)
+            except Exception as download_error:
+                logger.warning(f"Failed to download media for {content.get('url')}: {download_error}")
+        return content
+    
+    def _store_content(self, shortcode, content):
+        """Cache and index a successfully extracted content dict"""
+        if self.cache:
+            try:
+                self.cache.put(shortcode, content)
+            except Exception as cache_error:
+                logger.warning(f"Failed to cache content for {shortcode}: {cache_error}")
+        if self.index:
+            try:
+                with self.metrics.timer("stage_seconds", stage="index"):
+                    self.index.add(shortcode, content)
+            except Exception as index_error:
+                logger.warning(f"Failed to index content for {shortcode}: {index_error}")
+    
+    def extract(self, url, media=None, fallback=True):
+        """Extract with the account pool when one is configured, otherwise with this account"""
+        if self.account_pool:
+            return self.account_pool.extract_post_content(url, media=media, lane=self.rate_limiter.current_lane(),
+                                                          fallback=fallback)
+        return self.extract_post_content(url, media=media, fallback=fallback)
+    
+    def extract_post_content(self, url, media=None, fallback=True):
+        """Extract content from Instagram post/reel URL; fallback=False returns None instead of basic info"""
+        started = time.perf_counter()
         try:
             # Clean URL if it contains metadata
             url = self.clean_instagram_url(url)
             
             logger.info(f"Extracting content from: {url}")
             
-            # Check if we need to login
+            # Extract media ID from URL
+            link = parse_post_url(url)
+            if not link:
+                raise ValueError("Invalid Instagram URL format")
+            shortcode = link[1]
+            media_pk = shortcode_to_pk(shortcode)
+            
+            # Serve repeat shares from the cache without touching the API
+            if self.cache:
+                cached = self.cache.get(shortcode=shortcode, pk=media_pk)
+                self.metrics.inc("cache_lookups_total", result="hit" if cached else "miss")
+                if cached:
+                    self.metrics.inc("extraction_source_total", source="cache")
+                    logger.info(f"Using cached content for {shortcode}")
+                    return self._with_local_media({**cached, "url": url})
+            
+            # Posts indexed recently enough are reused as well, unless their signed CDN links have lapsed
+            if self.index:
+                indexed = self.index.get(shortcode=shortcode, max_age=self.index.reuse_ttl)
+                expiry = cdn_expiry(media_urls(indexed)) if indexed else None
+                if expiry is not None and expiry <= time.time():
+                    self.metrics.inc("index_stale_media_total")
+                    logger.debug(f"Indexed media links for {shortcode} expired, extracting again")
+                    indexed = None
+                if indexed:
+                    self.metrics.inc("extraction_source_total", source="index")
+                    logger.info(f"Using indexed content for {shortcode}")
+                    return self._with_local_media({**indexed, "url": url})
+            
+            # Shared media usually arrives fully hydrated in the DM payload
+            if media is not None and self.has_embedded_media(media):
+                content, complete = self.normalize_media(media, url, shortcode)
+                if complete:
+                    self.metrics.inc("extraction_source_total", source="embedded")
+                    self._with_local_media(content)
+                    self._store_content(shortcode, content)
+                    logger.info(f"Built content for @{content['username']} from the shared media without an API call")
+                    return content
+                logger.info("Shared media is incomplete, fetching it from the API")
+            
+            # Check if we need to login (once, even when several workers notice)
+            checked = time.time()
             if not self.is_login_valid():
                 logger.info("Session invalid or expired, logging in...")
-                if not self.login():
+                if not self.sessions.relogin(since=checked):
                     logger.error("Login failed, cannot extract content")
                     return None
             else:
-                logger.info("Using existing valid session")
+                logger.debug("Using existing valid session")
             
-            # Extract media ID from URL
-            
-            # Extract media ID from URL
-            if '/p/' in url:
-                shortcode = url.split('/p/')[1].split('/')[0]
-            elif '/reel/' in url:
-                shortcode = url.split('/reel/')[1].split('/')[0]
-            else:
-                raise ValueError("Invalid Instagram URL format")
-            
-            # Get media info with multiple fallback approaches
+            # Get media info, trying the historically best fetch method first
             media_info = None
             try:
-                # Primary method: Get media by shortcode
-                media_pk = self.client.media_pk_from_code(shortcode)
-                media_info = self.client.media_info(media_pk)
-                logger.info("Used primary media_info method")
-            except Exception as media_error:
-                logger.warning(f"Primary method failed: {media_error}")
-                
-                # Fallback 1: Try with media_pk_from_url
-                try:
-                    logger.info("Trying media_pk_from_url...")
-                    media_pk = self.client.media_pk_from_url(url)
-                    media_info = self.client.media_info(media_pk)
-                    logger.info("Used media_pk_from_url method")
-                except Exception as url_error:
-                    logger.warning(f"URL method failed: {url_error}")
-                    
-                    # Fallback 2: Try with media_info_v1
-                    try:
-                        logger.info("Trying media_info_v1...")
-                        media_pk = self.client.media_pk_from_code(shortcode)
-                        media_info = self.client.media_info_v1(media_pk)
-                        logger.info("Used media_info_v1 method")
-                    except Exception as v1_error:
-                        logger.warning(f"V1 method failed: {v1_error}")
-                        
-                        # Final fallback: Return basic info
-                        logger.info("Using basic fallback method...")
-                        try:
-                            # Create basic content structure for testing
-                            content = {
-                                "username": "unknown",
-                                "caption": f"Content from {url} (extracted using shortcode: {shortcode})",
-                                "media_type": "UNKNOWN",
-                                "media_url": "",
-                                "image_urls": [],
-                                "timestamp": datetime.now().isoformat(),
-                                "url": url,
-                                "pk": shortcode
-                            }
-                            logger.info("Created basic content info as fallback")
-                            return content
-                        except Exception as basic_error:
-                            logger.error(f"All extraction methods failed: {basic_error}")
-                            return None
+                with self.metrics.timer("stage_seconds", stage="fetch"):
+                    media_info, method = self.strategy.fetch(media_pk, self.rate_limiter.current_lane())
+                self.metrics.inc("extraction_method_total", method=method)
+                self.metrics.inc("extraction_source_total", source="api")
+                log_event(logger, logging.INFO, "extraction.method", f"Used {method} media_info method",
+                          method=method, shortcode=shortcode, ranking=self.strategy.ranked())
+            except Exception as fetch_error:
+                logger.warning(f"All media_info methods failed: {fetch_error}")
+                if not fallback:
+                    # The work queue retries the post later instead; the fetch timer already counted the error
+                    return None
+                return self.fallback_content(url)
             
             if not media_info:
                 logger.error("No media info available")
                 return None
             
-            # Safely extract information with fallbacks
-            try:
-                username = media_info.user.username if hasattr(media_info, 'user') and media_info.user else "unknown"
-                caption = media_info.caption_text if hasattr(media_info, 'caption_text') else ""
-                
-                # Handle media type extraction safely
-                media_type = "UNKNOWN"
-                if hasattr(media_info, 'media_type'):
-                    if hasattr(media_info.media_type, 'name'):
-                        media_type = media_info.media_type.name
-                    elif isinstance(media_info.media_type, str):
-                        media_type = media_info.media_type
-                    elif isinstance(media_info.media_type, int):
-                        # Map integer types to names
-                        type_mapping = {1: "PHOTO", 2: "VIDEO", 8: "CAROUSEL"}
-                        media_type = type_mapping.get(media_info.media_type, "UNKNOWN")
-                
-                # Handle media URL and image extraction safely
-                media_url = ""
-                image_urls = []
-                
-                # Extract video URL if available
-                if hasattr(media_info, 'video_url') and media_info.video_url:
-                    media_url = str(media_info.video_url)
-                
-                # Handle carousel posts (multiple images) - CHECK THIS FIRST
-                if hasattr(media_info, 'resources') and media_info.resources:
-                    logger.info(f"Found carousel with {len(media_info.resources)} resources")
-                    carousel_images = []
-                    for i, resource in enumerate(media_info.resources):
-                        try:
-                            # Method 1: image_versions2 (standard)
-                            if hasattr(resource, 'image_versions2') and resource.image_versions2:
-                                if hasattr(resource.image_versions2, 'candidates') and resource.image_versions2.candidates:
-                                    best_candidate = resource.image_versions2.candidates[0]
-                                    if hasattr(best_candidate, 'url'):
-                                        resource_url = str(best_candidate.url)
-                                        carousel_images.append(resource_url)
-                                        continue
-                            
-                            # Method 2: thumbnail_url (works for most carousels)
-                            if hasattr(resource, 'thumbnail_url') and resource.thumbnail_url:
-                                resource_url = str(resource.thumbnail_url)
-                                carousel_images.append(resource_url)
-                                continue
-                            
-                            # Method 3: display_url
-                            if hasattr(resource, 'display_url') and resource.display_url:
-                                resource_url = str(resource.display_url)
-                                carousel_images.append(resource_url)
-                                continue
-                                
-                        except Exception as resource_error:
-                            logger.error(f"Error processing carousel resource {i+1}: {resource_error}")
-                    
-                    if carousel_images:
-                        image_urls = carousel_images  # Use carousel images as primary image URLs
-                        logger.info(f"Successfully extracted {len(carousel_images)} carousel images")
-                    else:
-                        logger.warning("No carousel images extracted despite finding resources")
-                    
-                # If not a carousel, extract single post images
-                elif hasattr(media_info, 'image_versions2') and media_info.image_versions2:
-                    if hasattr(media_info.image_versions2, 'candidates'):
-                        for candidate in media_info.image_versions2.candidates:
-                            if hasattr(candidate, 'url'):
-                                image_urls.append(str(candidate.url))
-                        logger.info(f"Extracted {len(image_urls)} images from single post")
-                
-                # If no specific media URL and we have images, use first image
-                if not media_url and image_urls:
-                    media_url = image_urls[0]
-                
-                # Fallback image URL extraction
-                if not image_urls:
-                    if hasattr(media_info, 'thumbnail_url') and media_info.thumbnail_url:
-                        image_urls.append(str(media_info.thumbnail_url))
-                    elif hasattr(media_info, 'display_url') and media_info.display_url:
-                        image_urls.append(str(media_info.display_url))
-                
-                # Remove duplicates while preserving order
-                image_urls = list(dict.fromkeys(image_urls))
-                
-                timestamp = media_info.taken_at.isoformat() if hasattr(media_info, 'taken_at') and media_info.taken_at else datetime.now().isoformat()
-                pk = str(media_info.pk) if hasattr(media_info, 'pk') else shortcode
-                
-            except Exception as extract_error:
-                logger.error(f"Error extracting media fields: {extract_error}")
-                # Return basic structure even if extraction fails
-                username = "unknown"
-                caption = f"Content from {url}"
-                media_type = "UNKNOWN"
-                media_url = ""
-                image_urls = []
-                timestamp = datetime.now().isoformat()
-                pk = shortcode
-            
-            # Extract relevant information
-            content = {
-                "username": username,
-                "caption": caption or "",
-                "media_type": media_type,
-                "media_url": media_url,
-                "image_urls": image_urls,  # New field for image URLs
-                "timestamp": timestamp,
-                "url": url,  # Use the original clean URL
-                "pk": pk
-            }
+            content, cacheable = self.normalize_media(media_info, url, shortcode)
+            
+            self._with_local_media(content)
+            if cacheable:
+                self._store_content(shortcode, content)
             
             logger.info(f"Successfully extracted content from @{content['username']}")
             return content
             
         except Exception as e:
             logger.error(f"Failed to extract content: {e}")
+            self.metrics.inc("errors_total", stage="extract", type=type(e).__name__)
             return None
+        finally:
+            self.metrics.observe("stage_seconds", time.perf_counter() - started, stage="extract")
+    
+    def fallback_content(self, url):
+        """Return what is known about a post that could not be fetched: its cached caption, else basic info"""
+        url = self.clean_instagram_url(url)
+        link = parse_post_url(url)
+        if not link:
+            return None
+        shortcode = link[1]
+        
+        # A cached caption outlives its CDN links and beats the basic placeholder
+        if self.cache:
+            cached = self.cache.get(shortcode=shortcode, pk=shortcode_to_pk(shortcode), require_media=False)
+            if cached:
+                self.metrics.inc("extraction_source_total", source="cache_caption")
+                logger.info(f"Using cached caption for {shortcode} without media")
+                return {**cached, "url": url}
+        
+        # Final fallback: Return basic info
+        logger.info("Using basic fallback method...")
+        self.metrics.inc("extraction_source_total", source="fallback")
+        content = {
+            "username": "unknown",
+            "caption": f"Content from {url} (extracted using shortcode: {shortcode})",
+            "media_type": "UNKNOWN",
+            "media_url": "",
+            "image_urls": [],
+            "images": [],
+            "timestamp": datetime.now().isoformat(),
+            "url": url,
+            "pk": shortcode
+        }
+        logger.info("Created basic content info as fallback")
+        return content
+    
+    def dispatch_queued_jobs(self):
+        """Hand due queue jobs to the worker pool, keeping at most two per worker in flight"""
+        capacity = self.extraction_pool.max_workers * 2 - self.extraction_pool.pending()
+        for job in self.work_queue.claim(capacity):
+            # The last attempt may fall back to basic info rather than lose the post
+            self.extraction_pool.submit(job["thread_id"], job["url"], job, media=self._job_media.get(job["job_id"]),
+                                        fallback=self.work_queue.is_last_attempt(job))
+        self.update_queue_metrics()
+    
+    def update_queue_metrics(self):
+        stats = self.work_queue.get_stats()
+        self.metrics.set_gauge("queue_depth", stats["depth"])
+        self.metrics.set_gauge("queue_oldest_age_seconds", stats["oldest_age_seconds"])
+        for state in ("pending", "inflight", "dead"):
+            self.metrics.set_gauge("queue_jobs", stats[state], state=state)
+    
+    def emit_extraction_results(self, callback=None):
+        """Output finished extractions in per-thread order and settle their queue jobs"""
+        for url, job, content, error in self.extraction_pool.ready():
+            if error is not None:
+                log_event(logger, logging.ERROR, "extraction.failed", f"Error extracting content from {url}: {error}",
+                          url=url, error_type=type(error).__name__, error=str(error))
+                self.metrics.inc("errors_total", stage="extract", type=type(error).__name__)
+            self.metrics.inc("extraction_results_total", result="ok" if content else "failed")
+            
+            if content:
+                self.work_queue.complete(job["job_id"])
+                self._job_media.pop(job["job_id"], None)
+                self.metrics.inc("queue_jobs_total", result="done")
+                self._emit_content(url, content, callback)
+                continue
+            
+            state, delay = self.work_queue.fail(job["job_id"], error or "no content extracted")
+            if state == STATE_DEAD:
+                self._job_media.pop(job["job_id"], None)
+                self.metrics.inc("queue_jobs_total", result="dead")
+                log_event(logger, logging.ERROR, "extraction.dead", f"Giving up on {url} after {job['attempts'] + 1} attempts",
+                          url=url, message_id=job["message_id"], attempts=job["attempts"] + 1)
+            else:
+                self.metrics.inc("queue_jobs_total", result="retry")
+                log_event(logger, logging.WARNING, "extraction.retry", f"Retrying {url} in {delay:.0f} seconds",
+                          url=url, message_id=job["message_id"], attempts=job["attempts"] + 1, delay=round(delay, 1))
+    
+    def _emit_content(self, url, content, callback=None):
+        """Write extracted content to the output channel and pass it to the callback"""
+        if content:
+            log_event(logger, logging.INFO, "extraction.succeeded",
+                      f"Successfully extracted content from @{content.get('username', 'unknown')}",
+                      url=url, username=content.get('username'), media_type=content.get('media_type'),
+                      image_count=len(content.get('image_urls', [])))
+            
+            # One framed, untruncated record per post for Node.js
+            if self.output:
+                try:
+                    self.output.write("content", content)
+                except Exception as output_error:
+                    logger.error(f"Failed to write content record: {output_error}")
+            
+            if callback:
+                # Process the content using callback
+                callback(content)
+        else:
+            log_event(logger, logging.ERROR, "extraction.failed", f"Failed to extract content from: {url}", url=url)
+    
+    def wait_for_results(self, seconds):
+        """Sleep between polls while emitting extraction results as they finish"""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.emit_extraction_results(self._monitor_callback)
+            self.dispatch_queued_jobs()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self.extraction_pool.pending():
+                self.extraction_pool.wait(remaining)
+            else:
+                # Wake up for the next retry that falls due before the poll
+                due = self.work_queue.next_due_in()
+                time.sleep(remaining if due is None else min(remaining, max(due, 0.5)))
+    
+    def wait_until_next_poll(self, delay, reason=None):
+        """Log the scheduler's decision and wait for the next poll"""
+        next_poll = datetime.fromtimestamp(self.scheduler.next_poll_time).strftime('%H:%M:%S')
+        prefix = f"{reason}, waiting" if reason else "Waiting"
+        log_event(logger, logging.INFO, "poll.wait", f"{prefix} {delay:.0f} seconds before next check (next poll at {next_poll})",
+                  delay=round(delay, 1), next_poll=next_poll, reason=reason)
+        self.metrics.inc("polls_total", result=reason or "ok")
+        with self.metrics.timer("stage_seconds", stage="poll_sleep"):
+            self.wait_for_results(delay)
     
     def monitor_dms(self, callback=None):
         """Monitor direct messages for shared Instagram content"""
         logger.info("Starting DM monitoring...")
+        if self.processed_messages is None:
+            self.load_processed_messages()
+        if self.work_queue is None:
+            self.work_queue = WorkQueue.from_env()
+        
+        # Extractions run on a bounded worker pool so slow posts don't stall polling
+        if self.extraction_pool is None:
+            self.extraction_pool = ExtractionPool(
+                self.extract,
+                max_workers=int(os.getenv('INSTAGRAM_EXTRACT_WORKERS', '4'))
+            )
+        self._monitor_callback = callback
+        if self.scheduler is None:
+            self.scheduler = PollScheduler.from_env()
         
         # Get user ID for more targeted monitoring
         user_id = self.client.user_id
         logger.info(f"Monitoring DMs for user ID: {user_id}")
         
-        consecutive_errors = 0
-        max_consecutive_errors = 3
-        
         while True:
+            poll_started = time.perf_counter()
+            poll_wall_started = time.time()
             try:
+                new_message_count = 0
+                throttled = False
                 # Use a different approach to avoid the validation error
                 try:
-                    logger.info("Fetching recent DMs...")
-                    # Try to get threads using a more basic approach
-                    
-                    # Use the direct_pending_inbox method which might be more stable
                     threads = []
                     try:
-                        # Try different approaches to get DM threads
-                        logger.info("Attempting to get DM threads...")
-                        threads = self.client.direct_threads(amount=5)
-                        logger.info(f"Successfully fetched {len(threads)} threads")
-                        consecutive_errors = 0  # Reset error counter on success
+                        threads = self.call_api(self.client.direct_threads, amount=self.dm_thread_amount)
+                        log_event(logger, logging.DEBUG, "poll.threads", f"Successfully fetched {len(threads)} threads",
+                                  threads=len(threads))
                         
                     except Exception as thread_fetch_error:
                         logger.error(f"Failed to fetch threads: {thread_fetch_error}")
                         
+                        if is_throttle_error(thread_fetch_error):
+                            self.wait_until_next_poll(self.scheduler.record_throttle(), "Instagram asked to slow down")
+                            continue
+                        
                         # Skip validation errors and continue
                         if "validation error" in str(thread_fetch_error).lower() or "clips_metadata" in str(thread_fetch_error).lower():
-                            consecutive_errors += 1
-                            logger.warning(f"Validation error #{consecutive_errors}, continuing without processing threads...")
-                            
-                            if consecutive_errors >= max_consecutive_errors:
-                                logger.error("Too many consecutive validation errors, waiting longer...")
-                                time.sleep(300)  # Wait 5 minutes
-                                consecutive_errors = 0
-                                continue
-                            else:
-                                # Wait shorter time and continue
-                                time.sleep(60)
-                                continue
+                            logger.warning(f"Validation error #{self.scheduler.consecutive_errors + 1}, continuing without processing threads...")
+                            self.wait_until_next_poll(self.scheduler.record_error(), "Validation error")
+                            continue
                         else:
                             # For other errors, try re-login
-                            if not self.login():
-                                logger.error("Re-login failed, waiting longer...")
-                                time.sleep(300)
+                            if not self.sessions.relogin(since=poll_wall_started):
+                                self.wait_until_next_poll(self.scheduler.record_error(), "Re-login failed")
                                 continue
                     
                     # Process available threads if we got any
                     if threads:
-                        for thread in threads[:2]:  # Only process first 2 threads
+                        for thread in threads:
                             try:
                                 thread_id = thread.id
-                                logger.info(f"Checking thread: {thread_id}")
                                 
-                                # Get recent messages with minimal amount
-                                messages = self.client.direct_messages(thread_id, amount=3)
+                                # Only fetch items newer than the thread's cursor
+                                messages = self.fetch_new_messages(thread)
+                                new_message_count += len(messages)
+                                if not messages:
+                                    self.advance_thread_cursor(thread, messages)
+                                    continue
+                                log_event(logger, logging.INFO, "thread.synced", f"Checking thread: {thread_id} ({len(messages)} new messages)",
+                                          thread_id=str(thread_id), new_messages=len(messages))
                                 
                                 for message in messages:
                                     try:
                                         message_id = str(message.id)
                                         
                                         # Skip if already processed
-                                        if message_id in self.processed_messages:
+                                        if self.processed_messages.is_processed(message_id, getattr(message, 'timestamp', None)):
                                             continue
                                         
-                                        logger.info(f"Processing new message: {message_id}")
-                                        logger.info(f"Message type: {type(message)}")
-                                        logger.info(f"Message text: {getattr(message, 'text', 'No text')}")
-                                        logger.info(f"Message timestamp: {getattr(message, 'timestamp', 'No timestamp')}")
-                                        logger.info(f"Message has media_share: {hasattr(message, 'media_share')}")
-                                        
-                                        # Log all message attributes for debugging
-                                        message_attrs = [attr for attr in dir(message) if not attr.startswith('_')]
-                                        logger.info(f"Message attributes: {message_attrs}")
-                                        
-                                        # Check for media_share with detailed logging
-                                        if hasattr(message, 'media_share'):
-                                            media_share = getattr(message, 'media_share')
-                                            logger.info(f"Media share value: {media_share}, type: {type(media_share)}")
-                                            
-                                            if media_share is not None:
-                                                logger.info(f"Media share attributes: {[attr for attr in dir(media_share) if not attr.startswith('_')]}")
-                                                if hasattr(media_share, '__dict__'):
-                                                    logger.info(f"Media share dict keys: {list(media_share.__dict__.keys())}")
+                                        # Introspection dumps are only built when DEBUG is on
+                                        debug_dump(logger, f"Message {message_id}", message)
+                                        if getattr(message, 'media_share', None) is not None:
+                                            debug_dump(logger, f"Media share in {message_id}", message.media_share)
                                         
                                         # Check if message contains Instagram link
                                         instagram_urls = self.extract_instagram_urls(message)
-                                        logger.info(f"Extracted URLs: {instagram_urls}")
+                                        media_share = getattr(message, 'media_share', None)
+                                        share_shortcode = self.media_share_shortcode(media_share) if media_share is not None else None
+                                        log_event(logger, logging.INFO, "message.processed", f"Processing new message: {message_id}",
+                                                  message_id=message_id, thread_id=str(thread_id), url_count=len(instagram_urls))
+                                        self.metrics.inc("messages_processed_total", with_urls=str(bool(instagram_urls)).lower())
                                         
-                                        if instagram_urls:
-                                            logger.info(f"Found Instagram URL(s) in DM: {instagram_urls}")
-                                            
-                                            for url in instagram_urls:
-                                                try:
-                                                    logger.info(f"Extracting content from: {url}")
-                                                    # Extract content
-                                                    content = self.extract_post_content(url)
-                                                    
-                                                    if content:
-                                                        logger.info(f"Successfully extracted content from @{content.get('username', 'unknown')}")
-                                                        logger.info(f"Content keys: {list(content.keys())}")
-                                                        logger.info(f"Media type: {content.get('media_type', 'unknown')}")
-                                                        logger.info(f"Image count: {len(content.get('image_urls', []))}")
-                                                        
-                                                        # Output for Node.js processing with sanitization
-                                                        try:
-                                                            # Sanitize content before JSON output to prevent parsing issues
-                                                            sanitized_content = {
-                                                                **content,
-                                                                # Ensure URL is clean string
-                                                                'url': content['url'] if isinstance(content['url'], str) else str(content['url']),
-                                                                # Truncate very long image URLs for JSON output (Instagram URLs can be extremely long)
-                                                                'image_urls': [
-                                                                    img_url[:400] + '...' if len(img_url) > 400 else img_url 
-                                                                    for img_url in content.get('image_urls', [])
-                                                                ],
-                                                                # Truncate caption if extremely long
-                                                                'caption': content.get('caption', '')[:1000] + ('...' if len(content.get('caption', '')) > 1000 else '')
-                                                            }
-                                                            
-                                                            # Use ensure_ascii=True to avoid Unicode issues in JSON
-                                                            content_json = json.dumps(sanitized_content, ensure_ascii=True, separators=(',', ':'))
-                                                            
-                                                            # Log size for debugging
-                                                            logger.info(f"JSON output size: {len(content_json)} characters")
-                                                            
-                                                            print("CONTENT_EXTRACTED:", content_json)
-                                                            sys.stdout.flush()
-                                                        except Exception as json_error:
-                                                            logger.error(f"Failed to serialize content to JSON: {json_error}")
-                                                            # Fallback with minimal content
-                                                            basic_content = {
-                                                                'username': content.get('username', 'unknown'),
-                                                                'caption': content.get('caption', '')[:200],  # Very short caption
-                                                                'media_type': content.get('media_type', 'UNKNOWN'),
-                                                                'url': str(content.get('url', ''))[:200],  # Very short URL
-                                                                'pk': str(content.get('pk', '')),
-                                                                'image_urls': [f"Image {i+1}" for i in range(min(len(content.get('image_urls', [])), 3))]  # Placeholder names
-                                                            }
-                                                            print("CONTENT_EXTRACTED:", json.dumps(basic_content, ensure_ascii=True))
-                                                            sys.stdout.flush()
-                                                        
-                                                        if callback:
-                                                            # Process the content using callback
-                                                            callback(content)
-                                                    else:
-                                                        logger.error(f"Failed to extract content from: {url}")
-                                                    
-                                                    # Mark as processed
-                                                    self.processed_messages.add(message_id)
-                                                except Exception as extraction_error:
-                                                    logger.error(f"Error extracting content from {url}: {extraction_error}")
-                                                    # Still mark as processed to avoid infinite retries
-                                                    self.processed_messages.add(message_id)
-                                        else:
-                                            logger.info("No Instagram URLs found in message")
-                                            # Mark message as processed even if no URLs found
-                                            self.processed_messages.add(message_id)
+                                        # Queue the URLs durably; the message is done once they are queued
+                                        for url in instagram_urls:
+                                            job_id = self.work_queue.enqueue(url, message_id, thread_id, getattr(message, 'timestamp', None))
+                                            if job_id is None:
+                                                continue
+                                            self.metrics.inc("queue_jobs_total", result="queued")
+                                            log_event(logger, logging.INFO, "extraction.queued", f"Queueing extraction for: {url}",
+                                                      url=url, message_id=message_id, thread_id=str(thread_id), job_id=job_id)
+                                            # Let the worker build shared posts straight from the DM payload
+                                            if share_shortcode and url.endswith(f"/{share_shortcode}/"):
+                                                self._job_media[job_id] = media_share
+                                        self.processed_messages.add(message_id, thread_id, getattr(message, 'timestamp', None))
                                             
                                     except Exception as message_error:
                                         logger.error(f"Error processing message: {message_error}")
+                                        self.metrics.inc("errors_total", stage="message", type=type(message_error).__name__)
                                         # Mark as processed to avoid reprocessing
                                         if hasattr(message, 'id'):
-                                            self.processed_messages.add(str(message.id))
+                                            self.processed_messages.add(str(message.id), thread_id, getattr(message, 'timestamp', None))
                                         continue
+                                
+                                self.advance_thread_cursor(thread, messages)
                                         
                             except Exception as thread_error:
                                 logger.error(f"Error processing thread: {thread_error}")
+                                self.metrics.inc("errors_total", stage="thread", type=type(thread_error).__name__)
+                                if is_throttle_error(thread_error):
+                                    throttled = True
+                                    break
                                 continue
                     else:
-                        logger.info("No threads available for processing")
+                        logger.debug("No threads available for processing")
                     
                 except Exception as fetch_error:
                     logger.error(f"Critical error in DM fetching: {fetch_error}")
-                    time.sleep(120)
+                    self.wait_until_next_poll(self.scheduler.record_error(), "DM fetch failed")
                     continue
                 
-                # Save processed messages
+                # Start the queued extractions, then save processed messages
+                self.dispatch_queued_jobs()
                 self.save_processed_messages()
+                self.metrics.observe("stage_seconds", time.perf_counter() - poll_started, stage="poll")
                 
                 # Wait before next check
-                logger.info("Waiting 60 seconds before next check...")
-                time.sleep(60)
+                if throttled:
+                    self.wait_until_next_poll(self.scheduler.record_throttle(), "Instagram asked to slow down")
+                else:
+                    self.wait_until_next_poll(self.scheduler.record_poll(new_message_count))
                 
             except Exception as e:
                 logger.error(f"Critical error in DM monitoring: {e}")
-                consecutive_errors += 1
-                
-                if consecutive_errors >= max_consecutive_errors:
-                    logger.error("Too many consecutive critical errors, waiting longer...")
-                    time.sleep(300)  # Wait 5 minutes
-                    consecutive_errors = 0
-                else:
-                    logger.info("Waiting 120 seconds before retrying...")
-                    time.sleep(120)
+                self.metrics.inc("errors_total", stage="monitor", type=type(e).__name__)
+                self.wait_until_next_poll(self.scheduler.record_error(), "Monitoring error")
     
     def extract_instagram_urls(self, message):
         """Extract Instagram URLs from message text and media shares"""
         urls = []
         
         # Check message text first
-        if hasattr(message, 'text') and message.text and 'instagram.com' in message.text:
-            # Simple URL extraction (could be improved with regex)
-            words = message.text.split()
-            for word in words:
-                if 'instagram.com' in word and ('/p/' in word or '/reel/' in word):
-                    urls.append(word)
-                    logger.info(f"Found URL in text: {word}")
+        for kind, shortcode in find_post_links(getattr(message, 'text', None)):
+            url = canonical_url(kind, shortcode)
+            urls.append(url)
+            logger.debug(f"Found URL in text: {url}")
         
         # Check for media shares (Instagram native sharing) - this is the main case for DMs
-        logger.info(f"Checking for media_share: hasattr={hasattr(message, 'media_share')}")
-        
         if hasattr(message, 'media_share'):
             media_share = getattr(message, 'media_share')
-            logger.info(f"Media share value: {media_share}, type: {type(media_share)}")
             
             if media_share is not None:
-                logger.info("Found media_share, attempting to extract URL...")
+                logger.debug("Found media_share, attempting to extract URL...")
                 try:
                     # This is a shared Instagram post
                     media = media_share
-                    logger.info(f"Media share object type: {type(media)}")
-                    
-                    # Try different ways to get the shortcode/code
-                    shortcode = None
-                    
-                    # Method 1: Direct code attribute
-                    if hasattr(media, 'code') and media.code:
-                        shortcode = media.code
-                        logger.info(f"Found shortcode via 'code': {shortcode}")
-                    
-                    # Method 2: Try pk attribute
-                    elif hasattr(media, 'pk') and media.pk:
-                        shortcode = str(media.pk)
-                        logger.info(f"Found shortcode via 'pk': {shortcode}")
-                    
-                    # Method 3: Try id attribute
-                    elif hasattr(media, 'id') and media.id:
-                        shortcode = str(media.id)
-                        logger.info(f"Found shortcode via 'id': {shortcode}")
-                    
-                    # Method 4: Try direct attribute access without hasattr check
-                    if not shortcode:
-                        try:
-                            if media.code:
-                                shortcode = media.code
-                                logger.info(f"Found shortcode via direct 'code' access: {shortcode}")
-                        except:
-                            pass
-                    
-                    # Method 5: Try to extract from media info directly
-                    if not shortcode:
-                        try:
-                            # Sometimes the media object has the info we need
-                            if hasattr(media, 'taken_at') and hasattr(media, 'user'):
-                                # This looks like a valid media object, try to get media info
-                                media_pk = getattr(media, 'pk', None)
-                                if media_pk:
-                                    logger.info(f"Attempting to fetch media info for pk: {media_pk}")
-                                    try:
-                                        media_info = self.client.media_info(media_pk)
-                                        if hasattr(media_info, 'code') and media_info.code:
-                                            shortcode = media_info.code
-                                            logger.info(f"Found shortcode via media_info: {shortcode}")
-                                    except Exception as media_info_error:
-                                        logger.warning(f"Failed to get media_info: {media_info_error}")
-                        except Exception as extract_error:
-                            logger.warning(f"Failed to extract from media object: {extract_error}")
                     
-                    # Method 6: Last resort - use pk directly as shortcode if it looks valid
-                    if not shortcode:
-                        media_pk = getattr(media, 'pk', None)
-                        if media_pk and len(str(media_pk)) > 10:  # Instagram pks are long numbers
-                            # Convert pk to shortcode format
-                            try:
-                                # Instagram media ID to shortcode conversion
-                                import base64
-                                
-                                def media_id_to_shortcode(media_id):
-                                    """Convert Instagram media ID to shortcode"""
-                                    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
-                                    shortcode = ""
-                                    while media_id > 0:
-                                        shortcode = alphabet[media_id % 64] + shortcode
-                                        media_id //= 64
-                                    return shortcode
-                                
-                                shortcode = media_id_to_shortcode(int(media_pk))
-                                logger.info(f"Converted pk {media_pk} to shortcode: {shortcode}")
-                            except Exception as conversion_error:
-                                logger.warning(f"Failed to convert pk to shortcode: {conversion_error}")
+                    # Shortcode comes from the embedded code or a local pk conversion, no API call
+                    shortcode = self.media_share_shortcode(media)
                     
                     # Log all available attributes for debugging
-                    logger.info(f"Media attributes: {[attr for attr in dir(media) if not attr.startswith('_')]}")
-                    logger.info(f"Media code value: {getattr(media, 'code', 'NOT_FOUND')}")
-                    logger.info(f"Media pk value: {getattr(media, 'pk', 'NOT_FOUND')}")
-                    logger.info(f"Media id value: {getattr(media, 'id', 'NOT_FOUND')}")
+                    debug_dump(logger, "Media share", media)
                     
                     if shortcode:
-                        url = f"https://www.instagram.com/p/{shortcode}/"
+                        url = canonical_url("p", shortcode)
                         urls.append(url)
-                        logger.info(f"Successfully extracted URL from media_share: {url}")
+                        logger.debug(f"Successfully extracted URL from media_share: {url}")
                     else:
                         logger.warning(f"Could not extract shortcode from media_share despite multiple attempts")
-                        # Try to use the media object itself to construct URL
-                        if hasattr(media, '__dict__'):
-                            logger.info(f"Media object dict keys: {list(media.__dict__.keys()) if hasattr(media, '__dict__') else 'No __dict__'}")
                             
                 except Exception as e:
                     logger.error(f"Error processing media_share: {e}")
                     import traceback
                     logger.error(f"Full traceback: {traceback.format_exc()}")
             else:
-                logger.info("media_share attribute exists but is None - checking other message attributes")
+                logger.debug("media_share attribute exists but is None - checking other message attributes")
                 
                 # Sometimes the shared content might be in other attributes
-                logger.info(f"Message attributes: {[attr for attr in dir(message) if not attr.startswith('_')]}")
-                
-                # Check for other potential sharing mechanisms
                 if hasattr(message, 'visual_media') and message.visual_media:
-                    logger.info("Found visual_media, checking for Instagram content...")
+                    logger.debug("Found visual_media, checking for Instagram content...")
                 elif hasattr(message, 'media') and message.media:
-                    logger.info("Found media attribute, checking for Instagram content...")
+                    logger.debug("Found media attribute, checking for Instagram content...")
                 elif hasattr(message, 'link') and message.link:
-                    logger.info(f"Found link attribute: {message.link}")
-                    if 'instagram.com' in str(message.link):
-                        urls.append(str(message.link))
+                    logger.debug(f"Found link attribute: {message.link}")
+                    urls.extend(canonical_url(kind, shortcode) for kind, shortcode in find_post_links(str(message.link)))
         else:
-            logger.info("No media_share attribute found on message")
+            logger.debug("No media_share attribute found on message")
         
         # If no URLs found, log the message structure for debugging
         if not urls:
-            logger.info("No Instagram URLs found in message")
-            logger.info(f"Message type: {type(message)}")
-            logger.info(f"Message attributes: {[attr for attr in dir(message) if not attr.startswith('_')]}")
-            if hasattr(message, '__dict__'):
-                logger.info(f"Message dict keys: {list(message.__dict__.keys())}")
+            logger.debug("No Instagram URLs found in message")
+            debug_dump(logger, "Message without URLs", message)
         
         return urls
+    
+    def handle_request(self, request):
+        """Handle a single serve-mode request and return the correlated response"""
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            
+            action = request.get('action', 'extract')
+            
+            if action == 'ping':
+                return {"id": request_id, "ok": True, "result": "pong"}
+            
+            if action == 'stats':
+                stats = {
+                    "session": self.get_session_stats(),
+                    "polling": dict(self.poll_stats),
+                    "rate_limiter": self.rate_limiter.get_stats(),
+                    "strategy": self.strategy.get_stats()
+                }
+                if self.extraction_pool:
+                    stats["extraction_pool"] = self.extraction_pool.get_stats()
+                if self.work_queue:
+                    stats["queue"] = self.work_queue.get_stats()
+                if self.scheduler:
+                    stats["scheduler"] = self.scheduler.get_state()
+                if self.cache:
+                    stats["cache"] = self.cache.get_stats()
+                if self.index:
+                    stats["index"] = self.index.get_stats()
+                if self.downloader:
+                    stats["downloads"] = self.downloader.get_stats()
+                stats["metrics"] = self.metrics.snapshot()
+                if self.account_pool:
+                    stats["accounts"] = self.account_pool.get_stats()
+                return {"id": request_id, "ok": True, "result": stats}
+            
+            if action == 'search':
+                if not self.index:
+                    raise ValueError("The post index is disabled")
+                return {"id": request_id, "ok": True, "result": search_index(
+                    self.index, request.get('query'), url=request.get('url'),
+                    limit=int(request.get('limit', 20)), author=request.get('author'))}
+            
+            if action == 'extract':
+                url = request.get('url')
+                if not url:
+                    raise ValueError("URL required for extract action")
+                content = self.extract(url)
+                if content:
+                    return {"id": request_id, "ok": True, "result": content}
+                return {"id": request_id, "ok": False, "error": f"Failed to extract content from: {url}"}
+            
+            raise ValueError(f"Unknown action: {action}")
+            
+        except Exception as e:
+            logger.error(f"Error handling request {request_id}: {e}")
+            return {"id": request_id, "ok": False, "error": str(e)}
+
+def serve_stream(client, input_stream, output_stream, lock=None):
+    """Serve newline-delimited JSON requests from input_stream until EOF or shutdown"""
+    lock = lock or threading.Lock()
+    
+    for line in input_stream:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"id": None, "ok": False, "error": f"Invalid JSON: {e}"}
+        else:
+            if isinstance(request, dict) and request.get('action') == 'shutdown':
+                _write_response(output_stream, {"id": request.get('id'), "ok": True, "result": "bye"})
+                return False
+            
+            # The instagrapi client is not thread-safe, so requests run one at a time
+            with lock:
+                response = client.handle_request(request)
+        
+        _write_response(output_stream, response)
+    
+    return True
+
+def _write_response(output_stream, response):
+    """Write one JSON response line and flush it immediately"""
+    # Node's JSON.parse rejects NaN/Infinity, so fail loudly rather than emit them
+    data = json.dumps(response, ensure_ascii=False, separators=(',', ':'), allow_nan=False) + "\n"
+    if not isinstance(output_stream, io.TextIOBase):
+        data = data.encode('utf-8')
+    output_stream.write(data)
+    output_stream.flush()
+
+def serve_socket(client, socket_path):
+    """Serve newline-delimited JSON requests over a Unix socket"""
+    import socketserver
+    lock = threading.Lock()
+    
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            if not serve_stream(client, self.rfile, self.wfile, lock=lock):
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+    
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    
+    with socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler) as server:
+        logger.info(f"Serving requests on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+def extract_batch(client, input_stream, output_stream, workers=4):
+    """Extract every post linked from input_stream, streaming one JSON result line per post"""
+    started = time.time()
+    summary = {"urls_read": 0, "duplicates": 0, "succeeded": 0, "failed": 0}
+    
+    def extract_backfill(url):
+        # Batch work yields to live DM extraction sharing the same limiter
+        with client.rate_limiter.lane(LANE_BACKFILL):
+            return client.extract(url)
+    
+    # Workers overlap rate-limit waits, parsing and downloads, but each account's instagrapi client
+    # takes one API call at a time (see _limited_call); pooled accounts run in parallel
+    pool = ExtractionPool(extract_backfill, max_workers=workers)
+    seen = set()
+    
+    def emit_ready():
+        for url, shortcode, content, error in pool.ready():
+            if content:
+                summary["succeeded"] += 1
+                _write_response(output_stream, {"shortcode": shortcode, "url": url, "ok": True, "result": content})
+            else:
+                summary["failed"] += 1
+                reason = str(error) if error else f"Failed to extract content from: {url}"
+                _write_response(output_stream, {"shortcode": shortcode, "url": url, "ok": False, "error": reason})
+    
+    try:
+        for line in input_stream:
+            links = find_post_links(line)
+            # Private post links carry a longer shortcode for the same pk, so dedupe on the pk
+            for (kind, shortcode), media_pk in zip(links, shortcodes_to_pks([code for _, code in links])):
+                summary["urls_read"] += 1
+                key = media_pk or shortcode
+                if key in seen:
+                    summary["duplicates"] += 1
+                    continue
+                seen.add(key)
+                # Each post is its own key, so results stream out as soon as they finish
+                pool.submit(shortcode, canonical_url(kind, shortcode), shortcode)
+            emit_ready()
+        
+        while pool.pending():
+            pool.wait(1.0)
+            emit_ready()
+    finally:
+        pool.shutdown(wait=True)
+    
+    elapsed = time.time() - started
+    summary["rate_limiter"] = client.rate_limiter.get_stats()
+    summary["strategy"] = client.strategy.get_stats()
+    if client.account_pool:
+        summary["accounts"] = client.account_pool.get_stats()
+    summary.update({
+        "unique": len(seen),
+        "elapsed_seconds": round(elapsed, 3),
+        "posts_per_second": round((summary["succeeded"] + summary["failed"]) / elapsed, 3) if elapsed else 0.0
+    })
+    _write_response(output_stream, {"summary": summary})
+    return summary
+
+def search_index(index, query, url=None, limit=20, author=None):
+    """Look up one post by URL, or full-text search the index"""
+    if url:
+        link = parse_post_url(url)
+        if not link:
+            raise ValueError(f"Not an Instagram post URL: {url}")
+        return index.get(shortcode=link[1])
+    return index.search(query, limit=limit, username=author)
+
+def start_session_refresh(client):
+    """Refresh the sessions of the client and its pooled accounts in the background for long-running actions"""
+    clients = [account.client for account in client.account_pool.accounts] if client.account_pool else [client]
+    for pooled in clients:
+        pooled.sessions.start()
 
 def main():
     parser = argparse.ArgumentParser(description='Instagram Client Operations')
-    parser.add_argument('action', choices=['extract', 'monitor'], help='Action to perform')
-    parser.add_argument('--url', help='Instagram URL (for extract action)')
+    parser.add_argument('action', choices=['extract', 'extract-batch', 'monitor', 'serve', 'search'], help='Action to perform')
+    parser.add_argument('--url', help='Instagram URL (for extract action, or search action to look up one post)')
+    parser.add_argument('--input', default='-', help='File of URLs or JSON lines (for extract-batch action, defaults to stdin)')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('INSTAGRAM_EXTRACT_WORKERS', '4')),
+                        help='Concurrent extractions (for extract-batch action)')
+    parser.add_argument('--socket', help='Unix socket path (for serve action, defaults to stdin/stdout)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the local extraction cache')
+    parser.add_argument('--no-index', action='store_true', help='Neither read from nor write to the local post index')
+    parser.add_argument('--query', help='Full-text query, e.g. "pasta #food @someone" (for search action)')
+    parser.add_argument('--author', help='Only posts by this username (for search action)')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum results (for search action)')
+    parser.add_argument('--download', action='store_true', default=os.getenv('INSTAGRAM_DOWNLOAD_MEDIA', '0') == '1',
+                        help='Download images and videos to local files (INSTAGRAM_DOWNLOAD_DIR)')
+    parser.add_argument('--output-format', choices=FORMATS, default=os.getenv('INSTAGRAM_OUTPUT_FORMAT', 'ndjson'),
+                        help='Framing of monitor content records on stdout')
+    parser.add_argument('--metrics-port', type=int, default=int(os.getenv('INSTAGRAM_METRICS_PORT', '0')),
+                        help='Serve Prometheus /metrics on this localhost port (0 disables)')
+    parser.add_argument('--metrics-file', default=os.getenv('INSTAGRAM_METRICS_FILE'),
+                        help='Periodically write a JSON metrics snapshot to this file')
+    parser.add_argument('--record', metavar='FIXTURES', help='Record instagrapi responses to a fixture file for offline replay')
+    parser.add_argument('--replay', metavar='FIXTURES', help='Answer instagrapi calls from a recorded fixture file instead of Instagram')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Log module/instagrapi import time and time to the first API request on exit')
+    parser.add_argument('--log-format', choices=['text', 'json'], default=os.getenv('INSTAGRAM_LOG_FORMAT', 'text'),
+                        help='Diagnostic log format on stderr')
+    parser.add_argument('--log-level', default=os.getenv('INSTAGRAM_LOG_LEVEL', 'INFO'),
+                        help='Diagnostic log level (DEBUG enables message introspection dumps)')
     parser.add_argument('--username', help='Instagram username')
     parser.add_argument('--password', help='Instagram password')
     
     args = parser.parse_args()
+    configure_logging(args.log_format, args.log_level)
+    startup_profile["module_import_seconds"] = round(time.perf_counter() - MODULE_START, 4)
+    if args.profile_startup:
+        atexit.register(lambda: log_event(logger, logging.INFO, "startup.profile",
+                                          f"Startup profile: {json.dumps(startup_profile)}", **startup_profile))
+    
+    index = None if args.no_index else PostIndex.from_env()
+    
+    # Searching the local index needs no Instagram account
+    if args.action == 'search':
+        if not index:
+            logger.error("The search action needs the post index")
+            sys.exit(1)
+        result = search_index(index, args.query, url=args.url, limit=args.limit, author=args.author)
+        if not result:
+            sys.exit(1)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
     
     # Get credentials from environment or arguments
     username = args.username or os.getenv('INSTAGRAM_USERNAME')
@@ -736,7 +1288,34 @@ def main():
         sys.exit(1)
     
     # Create client
-    client = InstagramClient(username, password)
+    cache = None if args.no_cache else ExtractionCache.from_env()
+    downloader = None
+    if args.download:
+        from media_downloader import MediaDownloader
+        downloader = MediaDownloader.from_env()
+    api_client = None
+    if args.replay:
+        api_client = ReplayClient.from_file(args.replay)
+    elif args.record:
+        api_client = RecordingClient(load_instagrapi()(), args.record)
+    client = InstagramClient(username, password, cache=cache, downloader=downloader, client=api_client, index=index)
+    if args.record:
+        atexit.register(api_client.save)
+    
+    # Extra accounts share extraction load; DM polling stays on the main account
+    extra_accounts = [] if args.replay else AccountPool.credentials_from_env()
+    if extra_accounts:
+        clients = [client] + [
+            InstagramClient(extra_username, extra_password, cache=cache, downloader=downloader, metrics=client.metrics,
+                            index=index)
+            for extra_username, extra_password in extra_accounts if extra_username != username
+        ]
+        client.account_pool = AccountPool.from_env(clients, classify_api_error)
+        logger.info(f"Spreading extractions across {len(clients)} accounts")
+    if args.metrics_port:
+        client.metrics.serve_http(args.metrics_port)
+    if args.metrics_file:
+        client.metrics.write_snapshots(args.metrics_file, float(os.getenv('INSTAGRAM_METRICS_INTERVAL', '60')))
     
     # Only login if needed (session validation will happen in methods)
     logger.info("Initializing Instagram client...")
@@ -746,24 +1325,42 @@ def main():
             logger.error("URL required for extract action")
             sys.exit(1)
         
-        content = client.extract_post_content(args.url)
+        content = client.extract(args.url)
         if content:
             print(json.dumps(content, indent=2))
         else:
             sys.exit(1)
     
+    elif args.action == 'extract-batch':
+        if args.input == '-':
+            summary = extract_batch(client, sys.stdin, sys.stdout, args.workers)
+        else:
+            with open(args.input, 'r') as input_file:
+                summary = extract_batch(client, input_file, sys.stdout, args.workers)
+        logger.info(f"Batch finished: {summary['succeeded']} succeeded, {summary['failed']} failed, "
+                    f"{summary['posts_per_second']} posts/sec")
+        if summary["failed"] and not summary["succeeded"]:
+            sys.exit(1)
+    
     elif args.action == 'monitor':
         # For monitoring, we do need to ensure login
         if not client.is_login_valid():
             if not client.login():
                 logger.error("Failed to login")
                 sys.exit(1)
-        def process_content(content):
-            # Output the content as JSON for Node.js to process
-            print("CONTENT_EXTRACTED:", json.dumps(content))
-            sys.stdout.flush()
-        
-        client.monitor_dms(callback=process_content)
+        start_session_refresh(client)
+        # Content records are the only thing written to stdout
+        client.output = RecordWriter(sys.stdout, args.output_format)
+        client.monitor_dms()
+    
+    elif args.action == 'serve':
+        # Keep one warm client alive and answer JSON-lines requests
+        start_session_refresh(client)
+        if args.socket:
+            serve_socket(client, args.socket)
+        else:
+            logger.info("Serving requests on stdin/stdout")
+            serve_stream(client, sys.stdin, sys.stdout)
 
 if __name__ == "__main__":
     main()
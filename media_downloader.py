@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Media Downloader
+Streams post images and videos to content-addressed local files over a pooled HTTP session
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+import mimetypes
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+KNOWN_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.heic', '.mp4', '.mov'}
+
+
+class MediaDownloader:
+    def __init__(self, root='media', max_workers=4, chunk_size=64 * 1024, timeout=30.0, max_bytes=200 * 1024 * 1024):
+        self.root = root
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.stats = {"downloaded": 0, "deduplicated": 0, "reused": 0, "failed": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        # CDN URLs for one asset differ only in their signed query string
+        self._known = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (compatible; instagram-bot media fetcher)'
+
+        os.makedirs(os.path.join(root, '.partial'), exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Create a downloader configured from INSTAGRAM_DOWNLOAD_* environment variables"""
+        return cls(
+            root=os.getenv('INSTAGRAM_DOWNLOAD_DIR', 'media'),
+            max_workers=int(os.getenv('INSTAGRAM_DOWNLOAD_WORKERS', '4')),
+            max_bytes=int(os.getenv('INSTAGRAM_DOWNLOAD_MAX_BYTES', str(200 * 1024 * 1024)))
+        )
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    @staticmethod
+    def _extension(url, content_type):
+        suffix = os.path.splitext(urlparse(url).path)[1].lower()
+        if suffix in KNOWN_EXTENSIONS:
+            return suffix
+        guessed = mimetypes.guess_extension((content_type or '').split(';')[0].strip())
+        return guessed or '.bin'
+
+    def download(self, url):
+        """Stream url to disk and return its content-addressed local path"""
+        asset = urlparse(url).path
+        with self._lock:
+            known = self._known.get(asset)
+        if known and os.path.exists(known):
+            self._count("reused")
+            return known
+
+        partial = os.path.join(self.root, '.partial', uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                extension = self._extension(url, response.headers.get('Content-Type'))
+                with open(partial, 'wb') as output:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        size += len(chunk)
+                        if self.max_bytes and size > self.max_bytes:
+                            raise ValueError(f"Media larger than {self.max_bytes} bytes")
+                        digest.update(chunk)
+                        output.write(chunk)
+
+            name = digest.hexdigest()
+            path = os.path.join(self.root, name[:2], name + extension)
+            if os.path.exists(path):
+                # A repost of media we already have
+                os.remove(partial)
+                self._count("deduplicated")
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(partial, path)
+                self._count("downloaded")
+                self._count("bytes", size)
+        except Exception:
+            self._count("failed")
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        with self._lock:
+            self._known[asset] = path
+        return path
+
+    def _try_download(self, url):
+        try:
+            return self.download(url)
+        except Exception as e:
+            logger.warning(f"Failed to download {url[:120]}: {e}")
+            return None
+
+    def download_all(self, urls):
+        """Download urls with bounded parallelism; failed entries are None"""
+        return list(self._executor.map(self._try_download, urls))
+
+    def attach(self, content):
+        """Add media_path and image_paths for the content's media, keeping the original URLs"""
+        paths = content.get("image_paths")
+        if paths and all(path and os.path.exists(path) for path in paths):
+            return content
+
+        image_urls = content.get("image_urls") or []
+        media_url = content.get("media_url") or ""
+        extra = [media_url] if media_url and media_url not in image_urls else []
+        results = self.download_all(image_urls + extra)
+
+        content["image_paths"] = results[:len(image_urls)]
+        if extra:
+            content["media_path"] = results[-1]
+        elif media_url:
+            content["media_path"] = results[image_urls.index(media_url)]
+        return content
+
+    def get_stats(self):
+        """Return download counters"""
+        with self._lock:
+            return {**self.stats, "root": self.root, "max_workers": self.max_workers}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
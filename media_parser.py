@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Media Parser
+Reads the fields normalize_media needs straight from private API media JSON, skipping instagrapi's Pydantic models
+"""
+
+from datetime import datetime, timezone
+
+
+class RawVersions:
+    __slots__ = ("candidates",)
+
+    def __init__(self, candidates):
+        # Left as the raw {"url", "width", "height"} dicts; RenditionSelector reads dicts directly
+        self.candidates = candidates
+
+
+class RawUser:
+    __slots__ = ("pk", "username")
+
+    def __init__(self, user):
+        self.pk = str(user.get("pk") or user.get("id") or "")
+        self.username = user.get("username")
+
+
+class RawResource:
+    __slots__ = ("pk", "media_type", "video_url", "thumbnail_url", "image_versions2")
+
+    def __init__(self, resource):
+        candidates = (resource.get("image_versions2") or {}).get("candidates") or []
+        self.pk = str(resource.get("pk") or "")
+        self.media_type = resource.get("media_type")
+        self.video_url = largest_url(resource.get("video_versions"))
+        self.thumbnail_url = largest_url(candidates)
+        self.image_versions2 = RawVersions(candidates) if candidates else None
+
+
+class RawMedia:
+    """The subset of instagrapi's Media that normalize_media reads, with the same attribute names"""
+
+    __slots__ = ("pk", "id", "code", "media_type", "user", "caption_text", "taken_at",
+                 "video_url", "thumbnail_url", "image_versions2", "resources")
+
+    def __init__(self, item):
+        candidates = (item.get("image_versions2") or {}).get("candidates") or []
+        caption = item.get("caption")
+        taken_at = item.get("taken_at")
+        self.pk = str(item["pk"])
+        self.id = item.get("id")
+        self.code = item.get("code")
+        self.media_type = item.get("media_type")
+        self.user = RawUser(item.get("user") or {})
+        self.caption_text = (caption.get("text") if isinstance(caption, dict) else caption) or ""
+        self.taken_at = datetime.fromtimestamp(taken_at, timezone.utc) if taken_at else None
+        self.video_url = largest_url(item.get("video_versions"))
+        self.thumbnail_url = largest_url(candidates)
+        self.image_versions2 = RawVersions(candidates) if candidates else None
+        self.resources = [RawResource(resource) for resource in item.get("carousel_media") or ()]
+
+
+def largest_url(versions):
+    """Return the URL of the largest rendition in a video_versions or candidates list"""
+    best = None
+    best_area = -1
+    for version in versions or ():
+        area = (version.get("width") or 0) * (version.get("height") or 0)
+        if area > best_area and version.get("url"):
+            best, best_area = version["url"], area
+    return best
+
+
+def parse_media(item):
+    """Build a RawMedia from one private API media item; raises KeyError without a pk"""
+    return RawMedia(item)
+
+
+def parse_media_info(response):
+    """Parse a media/{pk}/info/ response"""
+    items = (response or {}).get("items") or []
+    if not items:
+        raise ValueError("media info response has no items")
+    return parse_media(items[0])
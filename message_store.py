@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Processed Message Store
+Indexed SQLite store of processed DM message IDs with age-based pruning
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def to_epoch(timestamp):
+    """Convert a datetime or number to epoch seconds, or None"""
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    try:
+        return float(timestamp)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProcessedMessageStore:
+    def __init__(self, path='processed_messages.db', legacy_path='processed_messages.json', max_age_days=30):
+        self.path = path
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS processed_messages (
+                message_id TEXT PRIMARY KEY,
+                thread_id TEXT,
+                message_ts REAL,
+                processed_at REAL NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_age ON processed_messages (processed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_thread ON processed_messages (thread_id)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS thread_cursors (
+                thread_id TEXT PRIMARY KEY,
+                last_activity_at REAL,
+                last_item_id TEXT,
+                last_item_ts REAL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+        if legacy_path:
+            self._migrate_legacy(legacy_path)
+
+    @classmethod
+    def from_env(cls):
+        """Create a store configured from INSTAGRAM_PROCESSED_* environment variables"""
+        return cls(
+            path=os.getenv('INSTAGRAM_PROCESSED_DB', 'processed_messages.db'),
+            max_age_days=float(os.getenv('INSTAGRAM_PROCESSED_MAX_AGE_DAYS', '30'))
+        )
+
+    def _migrate_legacy(self, legacy_path):
+        """Import IDs from the old processed_messages.json once"""
+        migrated = self._conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'legacy_migrated'"
+        ).fetchone()
+        if migrated or not os.path.exists(legacy_path):
+            return
+
+        try:
+            with open(legacy_path, 'r') as f:
+                message_ids = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read legacy processed messages: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed_messages (message_id, processed_at) VALUES (?, ?)",
+                ((str(message_id), now) for message_id in message_ids)
+            )
+            self._conn.execute("INSERT INTO store_meta VALUES ('legacy_migrated', ?)", (str(now),))
+            self._conn.commit()
+        logger.info(f"Migrated {len(message_ids)} processed message IDs from {legacy_path}")
+
+    def __contains__(self, message_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM processed_messages WHERE message_id = ?", (str(message_id),)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed_messages").fetchone()[0]
+
+    def is_processed(self, message_id, timestamp=None):
+        """Check a message, treating anything older than the pruning horizon as processed"""
+        message_ts = to_epoch(timestamp)
+        if message_ts is not None and message_ts < time.time() - self.max_age_days * 86400:
+            return True
+        return message_id in self
+
+    def add(self, message_id, thread_id=None, timestamp=None):
+        """Record a message as processed (committed on the next flush)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO processed_messages VALUES (?, ?, ?, ?)",
+                (str(message_id), str(thread_id) if thread_id else None, to_epoch(timestamp), time.time())
+            )
+            self._pending += 1
+
+    def flush(self):
+        """Commit pending additions"""
+        with self._lock:
+            if self._pending:
+                self._conn.commit()
+                self._pending = 0
+
+    def get_thread_cursor(self, thread_id):
+        """Return the stored sync cursor for a thread, or None if it was never synced"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_activity_at, last_item_id, last_item_ts FROM thread_cursors WHERE thread_id = ?",
+                (str(thread_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_activity_at": row[0], "last_item_id": row[1], "last_item_ts": row[2]}
+
+    def set_thread_cursor(self, thread_id, last_activity_at=None, last_item_id=None, last_item_ts=None):
+        """Advance a thread's sync cursor, keeping previous values for fields not given"""
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO thread_cursors VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET
+                    last_activity_at = COALESCE(excluded.last_activity_at, last_activity_at),
+                    last_item_id = COALESCE(excluded.last_item_id, last_item_id),
+                    last_item_ts = COALESCE(excluded.last_item_ts, last_item_ts),
+                    updated_at = excluded.updated_at""",
+                (str(thread_id), to_epoch(last_activity_at), str(last_item_id) if last_item_id else None,
+                 to_epoch(last_item_ts), time.time())
+            )
+            self._pending += 1
+
+    def prune(self, max_age_days=None, thread_id=None):
+        """Delete entries older than max_age_days, optionally limited to one thread"""
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        cutoff = time.time() - max_age_days * 86400
+        # processed_at is indexed and never earlier than message_ts; is_processed already treats messages
+        # older than the horizon as processed, so keeping an entry until its processing ages out is harmless
+        query = "DELETE FROM processed_messages WHERE processed_at < ?"
+        params = [cutoff]
+        if thread_id:
+            query += " AND thread_id = ?"
+            params.append(str(thread_id))
+
+        with self._lock:
+            deleted = self._conn.execute(query, params).rowcount
+            self._conn.commit()
+            self._pending = 0
+        if deleted:
+            logger.info(f"Pruned {deleted} processed message IDs older than {max_age_days} days")
+        return deleted
+
+    def close(self):
+        """Commit and close the underlying database connection"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Metrics
+In-process latency histograms and counters, exposed as Prometheus text on /metrics or as a JSON snapshot file
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cache hits (sub-millisecond) to slow API calls and poll sleeps backed off after a throttle
+DEFAULT_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0, 1800.0, 3600.0)
+
+PREFIX = "instagram_"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """Return (upper_bound, cumulative_count) pairs ending with +Inf"""
+        running = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket that contains it
+
+        Quantiles past the top bucket report its bound, a lower bound, so snapshots stay valid JSON
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, running in self.cumulative():
+            if running >= target:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.started = time.time()
+        self._server = None
+
+    def inc(self, name, amount=1, **labels):
+        """Increment counter name{labels}"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        """Set gauge name{labels} to its current value"""
+        key = _label_key(labels)
+        with self._lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name, seconds, **labels):
+        """Record one latency observation in histogram name{labels}"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block into histogram name{labels}; failures also count errors by exception type"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.inc("errors_total", stage=labels.get("stage", name), type=type(e).__name__)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        """Return all series as a JSON-friendly dict with p50/p90/p99 estimates"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self.counters.items()
+            }
+            gauges = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self.gauges.items()
+            }
+            histograms = {
+                name: [{
+                    "labels": dict(key),
+                    "count": hist.count,
+                    "sum": round(hist.total, 6),
+                    "p50": hist.quantile(0.5),
+                    "p90": hist.quantile(0.9),
+                    "p99": hist.quantile(0.99)
+                } for key, hist in series.items()]
+                for name, series in self.histograms.items()
+            }
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms
+        }
+
+    def render_prometheus(self):
+        """Return all series in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for key, value in series.items():
+                    lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for key, hist in series.items():
+                    for bound, running in hist.cumulative():
+                        le = "+Inf" if bound == float('inf') else repr(bound)
+                        lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, [('le', le)])} {running}")
+                    lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {hist.total}")
+                    lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {hist.count}")
+        lines.append(f"# TYPE {PREFIX}uptime_seconds gauge")
+        lines.append(f"{PREFIX}uptime_seconds {time.time() - self.started}")
+        return "\n".join(lines) + "\n"
+
+    def serve_http(self, port, host='127.0.0.1'):
+        """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+        # Imported here to keep it off the CLI startup path
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.render_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot(), allow_nan=False), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"metrics: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    def write_snapshots(self, path, interval=60.0):
+        """Rewrite a JSON snapshot file every interval seconds from a daemon thread"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    temp_path = f"{path}.tmp"
+                    with open(temp_path, 'w') as snapshot_file:
+                        json.dump(self.snapshot(), snapshot_file, allow_nan=False)
+                    os.replace(temp_path, path)
+                except Exception as e:
+                    logger.warning(f"Failed to write metrics snapshot: {e}")
+
+        threading.Thread(target=loop, name='metrics-snapshot', daemon=True).start()
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server = None
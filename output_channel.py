@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Output Channel
+Framed result records on stdout: newline-delimited UTF-8 JSON, or length-prefixed msgpack
+"""
+
+import json
+import struct
+import threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATS = ('ndjson', 'msgpack')
+
+
+class RecordWriter:
+    """Write one complete record per frame so a reader never sees half a payload"""
+
+    def __init__(self, stream, output_format='ndjson'):
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        if output_format == 'msgpack' and msgpack is None:
+            raise ImportError("msgpack output requires the msgpack package (pip install msgpack)")
+        # Frames are bytes; text streams are written through their binary buffer
+        self.stream = getattr(stream, 'buffer', stream)
+        self.output_format = output_format
+        self._lock = threading.Lock()
+
+    def encode(self, record):
+        if self.output_format == 'msgpack':
+            payload = msgpack.packb(record, use_bin_type=True, default=str)
+            return struct.pack('>I', len(payload)) + payload
+        # JSON escapes control characters, so a raw newline only ever ends a record
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+
+    def write(self, record_type, data):
+        """Write a {"type": record_type, "data": data} record and flush it"""
+        frame = self.encode({"type": record_type, "data": data})
+        with self._lock:
+            self.stream.write(frame)
+            self.stream.flush()
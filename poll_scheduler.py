@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Poll Scheduler
+Adaptive DM polling intervals: fast after activity, exponential backoff with jitter when idle or failing
+"""
+
+import os
+import time
+import random
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    def __init__(self, min_interval=15.0, max_interval=300.0, initial_interval=60.0, backoff=1.5,
+                 jitter=0.2, error_interval=60.0, max_error_interval=900.0, throttle_interval=600.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.error_interval = error_interval
+        self.max_error_interval = max_error_interval
+        self.throttle_interval = throttle_interval
+        self.interval = min(max(initial_interval, min_interval), max_interval)
+        self.consecutive_errors = 0
+        self.idle_polls = 0
+        self.last_delay = None
+        self.next_poll_time = None
+        self.stats = {"polls": 0, "active_polls": 0, "errors": 0, "throttles": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Create a scheduler configured from INSTAGRAM_POLL_* environment variables"""
+        return cls(
+            min_interval=float(os.getenv('INSTAGRAM_POLL_MIN_INTERVAL', '15')),
+            max_interval=float(os.getenv('INSTAGRAM_POLL_MAX_INTERVAL', '300')),
+            initial_interval=float(os.getenv('INSTAGRAM_POLL_INTERVAL', '60')),
+            backoff=float(os.getenv('INSTAGRAM_POLL_BACKOFF', '1.5')),
+            jitter=float(os.getenv('INSTAGRAM_POLL_JITTER', '0.2')),
+            error_interval=float(os.getenv('INSTAGRAM_POLL_ERROR_INTERVAL', '60')),
+            max_error_interval=float(os.getenv('INSTAGRAM_POLL_MAX_ERROR_INTERVAL', '900')),
+            throttle_interval=float(os.getenv('INSTAGRAM_POLL_THROTTLE_INTERVAL', '600'))
+        )
+
+    def _schedule(self, delay):
+        """Apply jitter, remember the next poll time and return the delay"""
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        delay = max(0.0, delay)
+        self.last_delay = delay
+        self.next_poll_time = time.time() + delay
+        return delay
+
+    def record_poll(self, new_items):
+        """Record a successful poll and return the delay before the next one"""
+        self.stats["polls"] += 1
+        self.consecutive_errors = 0
+        if new_items:
+            # Conversations tend to be bursty, so check again soon
+            self.stats["active_polls"] += 1
+            self.idle_polls = 0
+            self.interval = self.min_interval
+        else:
+            self.idle_polls += 1
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        return self._schedule(self.interval)
+
+    def record_error(self):
+        """Record a failed poll and return an exponentially growing delay"""
+        self.stats["errors"] += 1
+        self.consecutive_errors += 1
+        delay = min(self.error_interval * (2 ** (self.consecutive_errors - 1)), self.max_error_interval)
+        return self._schedule(delay)
+
+    def record_throttle(self, retry_after=None):
+        """Record an explicit throttling signal from Instagram and return the delay"""
+        self.stats["throttles"] += 1
+        self.consecutive_errors += 1
+        delay = max(retry_after or 0, self.throttle_interval * (2 ** (self.consecutive_errors - 1)))
+        # Resume at the slow end once the throttle clears
+        self.interval = self.max_interval
+        return self._schedule(min(delay, max(self.max_error_interval, self.throttle_interval)))
+
+    def get_state(self):
+        """Return the current interval, next poll time and counters"""
+        return {
+            **self.stats,
+            "interval": self.interval,
+            "last_delay": self.last_delay,
+            "next_poll_time": datetime.fromtimestamp(self.next_poll_time).isoformat() if self.next_poll_time else None,
+            "consecutive_errors": self.consecutive_errors,
+            "idle_polls": self.idle_polls
+        }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Post Index
+Permanent SQLite FTS5 index of extracted posts for full-text search and already-handled lookups
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)", re.UNICODE)
+MENTION_PATTERN = re.compile(r"@([\w.]+)", re.UNICODE)
+TERM_PATTERN = re.compile(r"[#@]?[\w.]+\*?", re.UNICODE)
+
+
+def extract_tags(caption):
+    """Return (hashtags, mentions) found in a caption, lower-cased and de-duplicated in order"""
+    caption = caption or ""
+    hashtags = list(dict.fromkeys(tag.lower() for tag in HASHTAG_PATTERN.findall(caption)))
+    mentions = list(dict.fromkeys(name.lower().rstrip('.') for name in MENTION_PATTERN.findall(caption)))
+    return hashtags, mentions
+
+
+def to_match_query(query):
+    """Turn free text into an FTS5 query: words match anywhere, #tag a hashtag, @name a mention or author"""
+    clauses = []
+    for term in TERM_PATTERN.findall(query or ""):
+        prefix = term.endswith('*')
+        word = term.rstrip('*').lstrip('#@').replace('"', '')
+        if not word:
+            continue
+        phrase = f'"{word}"' + ('*' if prefix else '')
+        if term.startswith('#'):
+            clauses.append(f"hashtags : {phrase}")
+        elif term.startswith('@'):
+            clauses.append(f"{{username mentions}} : {phrase}")
+        else:
+            clauses.append(phrase)
+    return " AND ".join(clauses)
+
+
+def snippet(caption, terms, width=120):
+    """Return about width characters of the caption around the first query term, with terms in [brackets]"""
+    caption = caption or ""
+    lowered = caption.lower()
+    positions = [lowered.find(term) for term in terms if term and term in lowered]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    text = caption[start:start + width]
+    for term in {term for term in terms if term}:
+        text = re.sub(rf"(?i)\b({re.escape(term)}\w*)", r"[\1]", text)
+    return ("…" if start else "") + text + ("…" if start + width < len(caption) else "")
+
+
+def to_epoch(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class PostIndex:
+    def __init__(self, path='post_index.db', reuse_ttl=6 * 3600, max_ranked=2000):
+        self.path = path
+        # Queries matching more posts than this rank only the most recently indexed max_ranked of them
+        self.max_ranked = max_ranked
+        # Extractions reuse an indexed post for this many seconds after it was indexed (negative: forever)
+        self.reuse_ttl = reuse_ttl
+        self.stats = {"writes": 0, "lookups": 0, "hits": 0, "searches": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY,
+                shortcode TEXT NOT NULL UNIQUE,
+                pk TEXT,
+                username TEXT,
+                caption TEXT,
+                hashtags TEXT,
+                mentions TEXT,
+                media_type TEXT,
+                url TEXT,
+                taken_at REAL,
+                indexed_at REAL NOT NULL,
+                content TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_pk ON posts (pk)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_taken ON posts (taken_at)")
+        # External-content FTS table kept in step with posts by triggers
+        self._conn.executescript(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                caption, username, hashtags, mentions, shortcode,
+                content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts (rowid, caption, username, hashtags, mentions, shortcode)
+                VALUES (new.id, new.caption, new.username, new.hashtags, new.mentions, new.shortcode);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, caption, username, hashtags, mentions, shortcode)
+                VALUES ('delete', old.id, old.caption, old.username, old.hashtags, old.mentions, old.shortcode);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, caption, username, hashtags, mentions, shortcode)
+                VALUES ('delete', old.id, old.caption, old.username, old.hashtags, old.mentions, old.shortcode);
+                INSERT INTO posts_fts (rowid, caption, username, hashtags, mentions, shortcode)
+                VALUES (new.id, new.caption, new.username, new.hashtags, new.mentions, new.shortcode);
+            END;"""
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Create an index configured from INSTAGRAM_INDEX_* environment variables"""
+        return cls(
+            path=os.getenv('INSTAGRAM_INDEX_PATH', 'post_index.db'),
+            reuse_ttl=float(os.getenv('INSTAGRAM_INDEX_REUSE_TTL', str(6 * 3600))),
+            max_ranked=int(os.getenv('INSTAGRAM_INDEX_MAX_RANKED', '2000'))
+        )
+
+    @staticmethod
+    def _row(shortcode, content, now):
+        hashtags, mentions = extract_tags(content.get("caption"))
+        return (
+            shortcode, str(content.get("pk") or ""), content.get("username"), content.get("caption") or "",
+            " ".join(hashtags), " ".join(mentions), content.get("media_type"), content.get("url"),
+            to_epoch(content.get("timestamp")), now, json.dumps(content, ensure_ascii=False)
+        )
+
+    def add_many(self, items):
+        """Index (shortcode, content) pairs in one transaction, replacing earlier versions of the same posts"""
+        now = time.time()
+        rows = [self._row(shortcode, content, now) for shortcode, content in items]
+        with self._lock:
+            self._conn.executemany(
+                """INSERT INTO posts (shortcode, pk, username, caption, hashtags, mentions, media_type, url,
+                                      taken_at, indexed_at, content)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(shortcode) DO UPDATE SET
+                    pk = excluded.pk, username = excluded.username, caption = excluded.caption,
+                    hashtags = excluded.hashtags, mentions = excluded.mentions, media_type = excluded.media_type,
+                    url = excluded.url, taken_at = excluded.taken_at, indexed_at = excluded.indexed_at,
+                    content = excluded.content""",
+                rows
+            )
+            self._conn.commit()
+            self.stats["writes"] += len(rows)
+
+    def add(self, shortcode, content):
+        """Index one extracted post"""
+        self.add_many([(shortcode, content)])
+
+    def get(self, shortcode=None, pk=None, max_age=None):
+        """Return the indexed content of a post, or None; max_age limits how long ago it was indexed"""
+        with self._lock:
+            self.stats["lookups"] += 1
+            if shortcode:
+                row = self._conn.execute("SELECT content, indexed_at FROM posts WHERE shortcode = ?", (shortcode,)).fetchone()
+            elif pk:
+                row = self._conn.execute("SELECT content, indexed_at FROM posts WHERE pk = ?", (str(pk),)).fetchone()
+            else:
+                row = None
+        if row is None or (max_age is not None and max_age >= 0 and time.time() - row[1] > max_age):
+            return None
+        self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def search(self, query, limit=20, username=None):
+        """Return the best matching posts, most relevant first, with a highlighted caption snippet"""
+        username = username.lstrip('@') if username else None
+        match = to_match_query(query)
+        if match:
+            if username:
+                match += f' AND username : "{username.replace(chr(34), "")}"'
+            # Rank and limit inside FTS5 first so only the top hits are joined and highlighted
+            sql = """SELECT posts.shortcode, posts.username, posts.url, posts.media_type, posts.taken_at, posts.caption, hits.rank
+                     FROM (SELECT rowid, rank FROM posts_fts WHERE posts_fts MATCH ? AND rowid >= ? ORDER BY rank LIMIT ?) AS hits
+                     JOIN posts ON posts.id = hits.rowid ORDER BY hits.rank"""
+            params = [match, 0, limit]
+        else:
+            # No text to match: newest posts, optionally of one author
+            sql = "SELECT shortcode, username, url, media_type, taken_at, caption, 0 FROM posts"
+            params = []
+            if username:
+                sql += " WHERE username = ? COLLATE NOCASE"
+                params.append(username)
+            sql += " ORDER BY taken_at DESC LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            self.stats["searches"] += 1
+            if match and self.max_ranked > 0:
+                # BM25 costs time per matching post; walking rowids newest first is cheap
+                cutoff = self._conn.execute(
+                    "SELECT rowid FROM posts_fts WHERE posts_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                    (match, self.max_ranked - 1)
+                ).fetchone()
+                if cutoff:
+                    params[1] = cutoff[0]
+            rows = self._conn.execute(sql, params).fetchall()
+        terms = [term.lstrip('#@').rstrip('*').lower() for term in TERM_PATTERN.findall(query or "")]
+        # The FTS match is per token ("jane" also hits "jane.doe"), so keep only exact, case-insensitive authors
+        author = username.lower() if username else None
+        return [{
+            "shortcode": shortcode,
+            "username": post_username,
+            "url": url,
+            "media_type": media_type,
+            "timestamp": datetime.fromtimestamp(taken_at).isoformat() if taken_at else None,
+            "snippet": snippet(caption, terms),
+            "score": round(-rank, 3) if match else None
+        } for shortcode, post_username, url, media_type, taken_at, caption, rank in rows
+            if not author or (post_username or "").lower() == author]
+
+    def get_stats(self):
+        with self._lock:
+            posts = self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        return {**self.stats, "posts": posts}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
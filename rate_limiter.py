@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter
+Per-endpoint token buckets, a global hourly request budget and priority lanes for instagrapi calls
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes: live DM extraction is served before backfill work
+LANE_LIVE = 0
+LANE_BACKFILL = 1
+LANE_NAMES = {LANE_LIVE: "live", LANE_BACKFILL: "backfill"}
+
+# Requests per minute and burst size for each instagrapi method
+DEFAULT_ENDPOINT_LIMITS = {
+    "media_info": (30, 5),
+    "media_info_v1": (30, 5),
+    "media_info_raw": (30, 5),
+    "direct_threads": (6, 2),
+    "direct_messages": (20, 5),
+    "user_info_by_username": (6, 2),
+}
+DEFAULT_LIMIT = (20, 5)
+
+# instagrapi methods that are computed locally and never hit the network
+LOCAL_METHODS = {"media_pk_from_code", "media_pk_from_url", "media_code_from_pk"}
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now):
+        """Add tokens for the time elapsed since the last refill"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self, now):
+        """Return seconds until one token can be taken"""
+        self.refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate if self.rate else float('inf'))
+        return wait
+
+
+def parse_limits(spec):
+    """Parse 'endpoint=per_minute/burst,...' overrides"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        per_minute, _, burst = value.partition('/')
+        limits[name.strip()] = (float(per_minute), int(burst or 1))
+    return limits
+
+
+class RateLimiter:
+    def __init__(self, endpoint_limits=None, default_limit=DEFAULT_LIMIT, hourly_budget=600, backfill_share=0.5):
+        self.endpoint_limits = {**DEFAULT_ENDPOINT_LIMITS, **(endpoint_limits or {})}
+        self.default_limit = default_limit
+        self.hourly_budget = hourly_budget
+        self.backfill_share = backfill_share
+        if hourly_budget < 1 or int(hourly_budget * backfill_share) < 1:
+            raise ValueError(
+                f"Rate limits leave no hourly budget (INSTAGRAM_RATE_HOURLY_BUDGET={hourly_budget}, "
+                f"INSTAGRAM_RATE_BACKFILL_SHARE={backfill_share}); both lanes need at least one call per hour"
+            )
+        self._buckets = {}
+        self._history = deque()
+        self._waiting = {LANE_LIVE: 0, LANE_BACKFILL: 0}
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self.metrics = {}
+        self.lane_wait = {name: 0.0 for name in LANE_NAMES.values()}
+
+    @classmethod
+    def from_env(cls):
+        """Create a limiter configured from INSTAGRAM_RATE_* environment variables"""
+        return cls(
+            endpoint_limits=parse_limits(os.getenv('INSTAGRAM_RATE_LIMITS', '')),
+            hourly_budget=int(os.getenv('INSTAGRAM_RATE_HOURLY_BUDGET', '600')),
+            backfill_share=float(os.getenv('INSTAGRAM_RATE_BACKFILL_SHARE', '0.5'))
+        )
+
+    @contextmanager
+    def lane(self, priority):
+        """Run the calls made by this thread inside the block in the given priority lane"""
+        previous = getattr(self._local, 'lane', LANE_LIVE)
+        self._local.lane = priority
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def current_lane(self):
+        """Return the priority lane of the calling thread"""
+        return getattr(self._local, 'lane', LANE_LIVE)
+
+    def _bucket(self, endpoint):
+        if endpoint not in self._buckets:
+            self._buckets[endpoint] = TokenBucket(*self.endpoint_limits.get(endpoint, self.default_limit))
+        return self._buckets[endpoint]
+
+    def _budget_wait(self, now, priority):
+        """Return seconds until the hourly budget allows another call in this lane"""
+        while self._history and now - self._history[0] >= 3600:
+            self._history.popleft()
+        budget = self.hourly_budget if priority == LANE_LIVE else int(self.hourly_budget * self.backfill_share)
+        if len(self._history) < budget:
+            return 0.0
+        return 3600 - (now - self._history[len(self._history) - budget])
+
+    def acquire(self, endpoint):
+        """Block until a call to endpoint is allowed and return the seconds waited"""
+        if endpoint in LOCAL_METHODS:
+            return 0.0
+
+        priority = self.current_lane()
+        started = time.monotonic()
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                bucket = self._bucket(endpoint)
+                while True:
+                    now = time.monotonic()
+                    # Backfill yields to any live call that is waiting
+                    if priority != LANE_LIVE and self._waiting[LANE_LIVE]:
+                        self._condition.wait(1.0)
+                        continue
+                    wait = max(bucket.time_until_available(now), self._budget_wait(now, priority))
+                    if wait <= 0:
+                        bucket.tokens -= 1
+                        self._history.append(now)
+                        break
+                    self._condition.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+
+        waited = time.monotonic() - started
+        self._record(endpoint, priority, waited)
+        return waited
+
+    def penalize(self, endpoint, seconds=60.0):
+        """Pause an endpoint after Instagram throttled it"""
+        with self._condition:
+            bucket = self._bucket(endpoint)
+            bucket.tokens = 0.0
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+            self.metrics.setdefault(endpoint, self._empty_metrics())["throttled"] += 1
+        logger.warning(f"Pausing {endpoint} calls for {seconds:.0f} seconds after throttling")
+
+    @staticmethod
+    def _empty_metrics():
+        return {"calls": 0, "total_wait": 0.0, "max_wait": 0.0, "throttled": 0}
+
+    def _record(self, endpoint, priority, waited):
+        with self._condition:
+            metrics = self.metrics.setdefault(endpoint, self._empty_metrics())
+            metrics["calls"] += 1
+            metrics["total_wait"] += waited
+            metrics["max_wait"] = max(metrics["max_wait"], waited)
+            self.lane_wait[LANE_NAMES[priority]] += waited
+
+    def get_stats(self):
+        """Return per-endpoint call/wait metrics and hourly budget usage"""
+        with self._condition:
+            now = time.monotonic()
+            used = sum(1 for timestamp in self._history if now - timestamp < 3600)
+            return {
+                "endpoints": {name: dict(metrics) for name, metrics in self.metrics.items()},
+                "lane_wait": dict(self.lane_wait),
+                "hourly_budget": self.hourly_budget,
+                "hourly_used": used
+            }
@@ -0,0 +1,82 @@
+/**
+ * Record Reader
+ * Reassembles framed records written by the Python output channel (output_channel.py)
+ * from arbitrarily split stdout chunks
+ */
+
+const NEWLINE = 0x0a;
+
+class RecordReader {
+  /**
+   * @param {string} format - 'ndjson' or 'msgpack' (must match --output-format)
+   * @param {Function} onRecord - Called with each decoded {type, data} record
+   * @param {Function} onError - Called with (error, rawFrame) for frames that fail to decode
+   */
+  constructor(format, onRecord, onError = () => {}) {
+    this.format = format;
+    this.onRecord = onRecord;
+    this.onError = onError;
+    this.pending = Buffer.alloc(0);
+
+    if (format === 'msgpack') {
+      // Optional dependency, only needed for the binary framing
+      this.decode = require('@msgpack/msgpack').decode;
+    } else if (format !== 'ndjson') {
+      throw new Error(`Unknown record format: ${format}`);
+    }
+  }
+
+  /**
+   * Feed one chunk of stdout data; emits every record completed by it
+   * @param {Buffer} chunk
+   */
+  push(chunk) {
+    this.pending = this.pending.length ? Buffer.concat([this.pending, chunk]) : chunk;
+    if (this.format === 'msgpack') {
+      this.readLengthPrefixed();
+    } else {
+      this.readLines();
+    }
+  }
+
+  readLines() {
+    let start = 0;
+    let end;
+    // Split on raw bytes so multi-byte UTF-8 characters are never cut in half
+    while ((end = this.pending.indexOf(NEWLINE, start)) !== -1) {
+      const frame = this.pending.subarray(start, end);
+      start = end + 1;
+      if (frame.length) {
+        this.emit(frame, () => JSON.parse(frame.toString('utf8')));
+      }
+    }
+    this.pending = this.pending.subarray(start);
+  }
+
+  readLengthPrefixed() {
+    let offset = 0;
+    while (this.pending.length - offset >= 4) {
+      const length = this.pending.readUInt32BE(offset);
+      if (this.pending.length - offset - 4 < length) {
+        break;
+      }
+      const frame = this.pending.subarray(offset + 4, offset + 4 + length);
+      offset += 4 + length;
+      this.emit(frame, () => this.decode(frame));
+    }
+    this.pending = this.pending.subarray(offset);
+  }
+
+  emit(frame, decode) {
+    let record;
+    try {
+      record = decode();
+    } catch (error) {
+      this.onError(error, frame);
+      return;
+    }
+    this.onRecord(record);
+  }
+}
+
+module.exports = { RecordReader };
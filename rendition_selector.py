@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Rendition Selector
+Picks one image rendition per logical image from Instagram's candidate lists by width or byte budget
+"""
+
+import os
+
+# Rough size of an Instagram JPEG per pixel, used when choosing by byte budget
+BYTES_PER_PIXEL = 0.2
+
+
+def _field(candidate, name):
+    if isinstance(candidate, dict):
+        return candidate.get(name)
+    return getattr(candidate, name, None)
+
+
+def parse_policy(policy):
+    """Parse 'max', 'thumbnail', '<=WIDTH' or 'bytes<=N' into (kind, limit)"""
+    policy = (policy or 'max').strip().lower()
+    if policy in ('max', 'thumbnail'):
+        return policy, None
+    if policy.startswith('bytes<='):
+        return 'bytes', int(policy[len('bytes<='):])
+    if policy.startswith('<='):
+        return 'width', int(policy[2:])
+    raise ValueError(f"Unknown rendition policy: {policy}")
+
+
+class RenditionSelector:
+    def __init__(self, policy='max'):
+        self.policy = policy
+        self.kind, self.limit = parse_policy(policy)
+
+    @classmethod
+    def from_env(cls):
+        """Create a selector from INSTAGRAM_IMAGE_RENDITION"""
+        return cls(os.getenv('INSTAGRAM_IMAGE_RENDITION', 'max'))
+
+    def select(self, candidates):
+        """Return {"url", "width", "height"} for the candidate matching the policy, or None"""
+        best = None
+        best_width = None
+        for candidate in candidates or ():
+            url = _field(candidate, 'url')
+            if not url:
+                continue
+            width = _field(candidate, 'width') or 0
+            height = _field(candidate, 'height') or 0
+            if best is None or self._better(width, height, best_width, best):
+                best = (str(url), width, height)
+                best_width = width
+        if best is None:
+            return None
+        url, width, height = best
+        return {"url": url, "width": width or None, "height": height or None}
+
+    def _better(self, width, height, best_width, best):
+        if self.kind == 'max':
+            return width > best_width
+        if self.kind == 'thumbnail':
+            return width < best_width
+        if self.kind == 'width':
+            fits, best_fits = width <= self.limit, best_width <= self.limit
+        else:
+            fits = width * height * BYTES_PER_PIXEL <= self.limit
+            best_fits = best_width * best[2] * BYTES_PER_PIXEL <= self.limit
+        if fits != best_fits:
+            return fits
+        # Largest that fits, or the smallest when nothing fits
+        return width > best_width if fits else width < best_width
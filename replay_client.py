@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Replay Client
+Records the instagrapi Client calls InstagramClient makes and replays them offline with injected latency and errors
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from shortcode_codec import shortcode_to_pk, pk_to_shortcode
+
+logger = logging.getLogger(__name__)
+
+RECORDED_METHODS = (
+    "direct_threads", "direct_messages", "media_pk_from_code",
+    "media_info", "media_info_v1", "user_info_by_username", "private_request"
+)
+
+# Marks serialized datetimes so they are revived on replay
+DATETIME_TAG = "__datetime__"
+
+
+def to_fixture(value):
+    """Convert instagrapi models (pydantic), enums and datetimes into plain JSON data"""
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    if hasattr(value, 'model_dump'):
+        return to_fixture(value.model_dump())
+    if hasattr(value, 'dict') and hasattr(value, '__fields__'):
+        return to_fixture(value.dict())
+    if isinstance(value, dict):
+        return {str(key): to_fixture(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_fixture(item) for item in value]
+    if hasattr(value, 'value') and type(value).__module__ != 'builtins':
+        return to_fixture(value.value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def from_fixture(value):
+    """Rebuild attribute-style objects like the ones instagrapi returns"""
+    if isinstance(value, dict):
+        if set(value) == {DATETIME_TAG}:
+            return datetime.fromisoformat(value[DATETIME_TAG])
+        return SimpleNamespace(**{key: from_fixture(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [from_fixture(item) for item in value]
+    return value
+
+
+def call_key(args, kwargs):
+    return json.dumps([to_fixture(list(args)), to_fixture(kwargs)], sort_keys=True)
+
+
+class RecordingClient:
+    """Wraps a live instagrapi Client and records the results of RECORDED_METHODS"""
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+        self._lock = threading.Lock()
+        self.fixtures = {name: {} for name in RECORDED_METHODS}
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name not in RECORDED_METHODS:
+            return attribute
+
+        def recorded(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            with self._lock:
+                self.fixtures[name][call_key(args, kwargs)] = to_fixture(result)
+            return result
+
+        recorded.__name__ = name
+        return recorded
+
+    def save(self):
+        """Write every recorded call to the fixture file"""
+        with self._lock:
+            with open(self._path, 'w') as fixture_file:
+                json.dump({"recorded_at": datetime.now().isoformat(), "calls": self.fixtures}, fixture_file, ensure_ascii=False)
+        logger.info(f"Saved {sum(len(calls) for calls in self.fixtures.values())} recorded calls to {self._path}")
+
+
+class ReplayClient:
+    """Offline stand-in for instagrapi.Client that answers from recorded fixtures"""
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, error=ConnectionError, seed=None):
+        self.calls = fixtures.get("calls", fixtures)
+        # latency is seconds for every call or a {method: seconds} dict
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error = error
+        self.user_id = fixtures.get("user_id", 1)
+        self.stats = {name: 0 for name in RECORDED_METHODS}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, 'r') as fixture_file:
+            return cls(json.load(fixture_file), **kwargs)
+
+    def _replay(self, name, args, kwargs, revive=True):
+        with self._lock:
+            self.stats[name] += 1
+            delay = self.latency.get(name, 0.0) if isinstance(self.latency, dict) else self.latency
+            if self.jitter:
+                delay *= 1 + self._random.uniform(-self.jitter, self.jitter)
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise self.error(f"Injected {name} failure")
+
+        recorded = self.calls.get(name, {})
+        key = call_key(args, kwargs)
+        if key in recorded:
+            return from_fixture(recorded[key]) if revive else recorded[key]
+        # Paging arguments differ between runs; fall back to any recording for the same target
+        for recorded_key, result in recorded.items():
+            if json.loads(recorded_key)[0][:1] == to_fixture(list(args[:1])):
+                return from_fixture(result) if revive else result
+        raise KeyError(f"No recorded {name} call for {key}")
+
+    def direct_threads(self, *args, **kwargs):
+        return self._replay("direct_threads", args, kwargs)
+
+    def direct_messages(self, *args, **kwargs):
+        return self._replay("direct_messages", args, kwargs)
+
+    def media_pk_from_code(self, code):
+        with self._lock:
+            self.stats["media_pk_from_code"] += 1
+        return shortcode_to_pk(code)
+
+    def media_info(self, *args, **kwargs):
+        return self._replay("media_info", args, kwargs)
+
+    def media_info_v1(self, *args, **kwargs):
+        try:
+            return self._replay("media_info_v1", args, kwargs)
+        except KeyError:
+            return self._replay("media_info", args, kwargs)
+
+    def private_request(self, endpoint, *args, **kwargs):
+        # Raw API JSON is returned as recorded, not as attribute-style objects
+        return self._replay("private_request", (endpoint,) + args, kwargs, revive=False)
+
+    def user_info_by_username(self, *args, **kwargs):
+        try:
+            return self._replay("user_info_by_username", args, kwargs)
+        except KeyError:
+            return SimpleNamespace(pk=self.user_id, username=args[0] if args else None)
+
+    # Session plumbing InstagramClient.login expects
+    def login(self, username, password, **kwargs):
+        return True
+
+    def load_settings(self, path):
+        return {}
+
+    def dump_settings(self, path):
+        with open(path, 'w') as settings_file:
+            json.dump({"replay": True}, settings_file)
+
+    def get_settings(self):
+        return {}
+
+    def set_settings(self, settings):
+        pass
+
+
+def raw_media(media):
+    """Reshape a synthetic media fixture into the private API JSON that media/{pk}/info/ returns"""
+    def versions(candidates):
+        return {"candidates": candidates, "additional_candidates": {"igtv_first_frame": candidates[-1]}}
+
+    taken_at = datetime.fromisoformat(media["taken_at"][DATETIME_TAG]).replace(tzinfo=timezone.utc)
+    item = {
+        "pk": int(media["pk"]), "id": media["id"], "code": media["code"], "media_type": media["media_type"],
+        "taken_at": int(taken_at.timestamp()), "product_type": "carousel_container" if media["resources"] else "feed",
+        "user": {**media["user"], "pk": int(media["user"]["pk"]), "full_name": "", "is_private": False,
+                 "is_verified": False, "profile_pic_url": media["thumbnail_url"]},
+        "caption": {"pk": media["pk"], "text": media["caption_text"], "created_at": int(taken_at.timestamp())},
+        "like_count": 1200, "comment_count": 34, "play_count": None, "has_liked": False,
+        "usertags": {"in": []}, "clips_metadata": None, "location": None,
+        "image_versions2": versions(media["image_versions2"]["candidates"])
+    }
+    if media["resources"]:
+        item["carousel_media_count"] = len(media["resources"])
+        item["carousel_media"] = [{
+            "pk": resource["pk"], "id": f"{resource['pk']}_42", "media_type": resource["media_type"],
+            "image_versions2": versions(resource["image_versions2"]["candidates"])
+        } for resource in media["resources"]]
+    return item
+
+
+def make_synthetic_fixtures(posts=200, threads=10, messages_per_thread=20, seed=7):
+    """Build fixtures shaped like recorded instagrapi responses for benchmarks without an account"""
+    rng = random.Random(seed)
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    pks = [rng.randrange(10 ** 18, 4 * 10 ** 18) for _ in range(posts)]
+
+    def media(pk, index):
+        carousel = index % 3 == 0
+        candidates = [{"url": f"https://scontent.cdninstagram.com/v/{pk}_{width}.jpg?oe=66600000", "width": width,
+                       "height": width} for width in (1440, 1080, 750, 640, 320)]
+        resources = [{"pk": pk + item, "media_type": 1, "thumbnail_url": candidates[0]["url"],
+                      "image_versions2": {"candidates": candidates}} for item in range(4)] if carousel else []
+        return {
+            "pk": str(pk), "id": f"{pk}_42", "code": pk_to_shortcode(pk), "media_type": 8 if carousel else 1,
+            "user": {"pk": "42", "username": f"creator{index % 25}"},
+            "caption_text": f"Post {index} " + "lorem ipsum dolor sit amet " * rng.randint(1, 30) + "#food @friend",
+            "taken_at": {DATETIME_TAG: (now - timedelta(days=index)).isoformat()},
+            "thumbnail_url": candidates[0]["url"], "video_url": None,
+            "image_versions2": {"candidates": candidates}, "resources": resources
+        }
+
+    calls = {name: {} for name in RECORDED_METHODS}
+    for index, pk in enumerate(pks):
+        calls["media_info"][call_key((str(pk),), {})] = media(pk, index)
+        calls["private_request"][call_key((f"media/{pk}/info/",), {})] = {
+            "items": [raw_media(calls["media_info"][call_key((str(pk),), {})])], "num_results": 1, "status": "ok"
+        }
+
+    thread_list = []
+    for thread_index in range(threads):
+        thread_id = str(340282366841710300949128 + thread_index)
+        items = []
+        for item_index in range(messages_per_thread):
+            pk = pks[(thread_index * messages_per_thread + item_index) % posts]
+            timestamp = now - timedelta(minutes=thread_index * messages_per_thread + item_index)
+            item = {"id": f"{thread_id}{item_index:04d}", "user_id": "7", "thread_id": thread_id,
+                    "timestamp": {DATETIME_TAG: timestamp.isoformat()}, "item_type": "text", "text": None,
+                    "media_share": None, "link": None}
+            if item_index % 3 == 0:
+                item["item_type"] = "media_share"
+                item["media_share"] = media(pk, item_index)
+            elif item_index % 3 == 1:
+                item["text"] = f"look at this https://www.instagram.com/p/{pk_to_shortcode(pk)}/?igsh=abc123"
+            else:
+                item["text"] = "haha yes, dinner at 8?"
+            items.append(item)
+        items.reverse()
+        thread_list.append({"id": thread_id, "last_activity_at": items[0]["timestamp"], "messages": items[:5]})
+        calls["direct_messages"][call_key((thread_id,), {"amount": 20})] = items
+
+    calls["direct_threads"][call_key((), {"amount": 20})] = thread_list
+    return {"user_id": 1, "calls": calls}
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Session Manager
+Restores saved Instagram sessions without a login round trip and refreshes them in the background
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SessionManager:
+    def __init__(self, owner, session_path, refresh_after=86400.0, check_interval=300.0):
+        # owner is the InstagramClient whose instagrapi client, login state and metrics this manages
+        self.owner = owner
+        self.session_path = session_path
+        self.refresh_after = refresh_after
+        self.check_interval = check_interval
+        # The single lock every (re-)login goes through
+        self.lock = threading.Lock()
+        self.created_at = None
+        self.restored = False
+        self._restore_attempted = False
+        self._last_dump = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "restores": 0,
+            "logins": 0,
+            "relogins_joined": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "dumps": 0,
+            "last_login_seconds": None,
+            "last_refresh_seconds": None
+        }
+
+    @classmethod
+    def from_env(cls, owner):
+        """Create a manager for owner's session file, configured from INSTAGRAM_SESSION_* environment variables"""
+        return cls(
+            owner,
+            f"{owner.username}_session.json",
+            refresh_after=float(os.getenv('INSTAGRAM_SESSION_REFRESH', '86400')),
+            check_interval=float(os.getenv('INSTAGRAM_SESSION_CHECK_INTERVAL', '300'))
+        )
+
+    def restore(self):
+        """Load the saved session once per process without contacting Instagram; returns True if one was loaded
+
+        Only the first call, and only before any login, may load it: later calls come from re-logins
+        replacing a session Instagram rejected, usually the one in that same file
+        """
+        attempted, self._restore_attempted = self._restore_attempted, True
+        if attempted or self.created_at is not None or not os.path.exists(self.session_path):
+            return False
+        try:
+            settings = self.owner.client.load_settings(self.session_path) or {}
+        except Exception as e:
+            logger.warning(f"Saved session {self.session_path} is unreadable, removing it: {e}")
+            os.remove(self.session_path)
+            return False
+        self.created_at = settings.get("last_login") or os.path.getmtime(self.session_path)
+        self._last_dump = time.time()
+        self.restored = True
+        self.stats["restores"] += 1
+        return True
+
+    def login(self):
+        """Log in with credentials (reusing the loaded device settings) and save the new session"""
+        started = time.perf_counter()
+        with self.owner.metrics.timer("stage_seconds", stage="login"):
+            # instagrapi returns early when loaded settings hold a user id; relogin drops them for a real login
+            self.owner.client.login(self.owner.username, self.owner.password, relogin=self.created_at is not None)
+            self.save()
+        self.created_at = time.time()
+        self.restored = False
+        self.stats["logins"] += 1
+        self.stats["last_login_seconds"] = round(time.perf_counter() - started, 3)
+
+    def save(self):
+        """Write the client's current settings (cookies rotate as requests are made) to the session file"""
+        self.owner.client.dump_settings(self.session_path)
+        self._last_dump = time.time()
+        self.stats["dumps"] += 1
+
+    def relogin(self, since=None, invalidate=True):
+        """Log in again unless another caller already did after since; concurrent callers share one login
+
+        invalidate=False keeps the current session usable while the new one is obtained
+        """
+        with self.lock:
+            owner = self.owner
+            if since is not None and owner.logged_in and owner._login_time and owner._login_time >= since:
+                self.stats["relogins_joined"] += 1
+                return True
+            if owner._login_time:
+                owner.session_stats["relogins"] += 1
+            if invalidate:
+                owner.invalidate_session()
+            return owner.login()
+
+    def start(self):
+        """Keep the session fresh from a daemon thread so extractions never wait on a login"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"session-{self.owner.username}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh_once()
+            except Exception as e:
+                self.stats["refresh_failures"] += 1
+                logger.warning(f"Background session refresh failed: {e}")
+
+    def refresh_once(self):
+        """Re-login when the session is old, re-check it before the trusted window lapses, or re-save it"""
+        owner = self.owner
+        if not owner.logged_in:
+            return
+        now = time.time()
+        last_seen = owner._last_success_time or owner._login_time or now
+
+        if self.created_at and now - self.created_at > self.refresh_after:
+            # Still valid, so extractions keep using it during the login
+            reason, invalidate = "session is due for renewal", False
+        elif now - last_seen > owner.session_ttl - self.check_interval and not owner.is_login_valid(force=True):
+            reason, invalidate = "session failed its validity check", True
+        else:
+            # Persist rotated cookies so the next warm start restores a current session
+            if owner._last_success_time and owner._last_success_time > self._last_dump:
+                self.save()
+            return
+
+        started = time.perf_counter()
+        logger.info(f"Refreshing session for {owner.username} in the background: {reason}")
+        with owner.metrics.timer("stage_seconds", stage="session_refresh"):
+            ok = self.relogin(since=now, invalidate=invalidate)
+        self.stats["last_refresh_seconds"] = round(time.perf_counter() - started, 3)
+        self.stats["refreshes" if ok else "refresh_failures"] += 1
+
+    def get_stats(self):
+        """Return session age, warm-start and refresh counters"""
+        return {
+            **self.stats,
+            "restored": self.restored,
+            "session_created_age": round(time.time() - self.created_at, 1) if self.created_at else None,
+            "background_refresh": self._thread is not None
+        }
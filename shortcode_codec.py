@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Shortcode Codec
+Local conversion between Instagram shortcodes and media pks, singly or in batches, with no API calls
+"""
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_DECODE = {char: index for index, char in enumerate(ALPHABET)}
+
+# Private post shortcodes append extra characters; only the first 11 encode the pk
+PK_CODE_LENGTH = 11
+
+
+def shortcode_to_pk(shortcode):
+    """Decode a shortcode to its media pk as an int"""
+    pk = 0
+    try:
+        for char in shortcode[:PK_CODE_LENGTH]:
+            pk = pk * 64 + _DECODE[char]
+    except KeyError as e:
+        raise ValueError(f"Invalid shortcode character {e} in {shortcode!r}") from None
+    if not shortcode:
+        raise ValueError("Empty shortcode")
+    return pk
+
+
+def pk_to_shortcode(media_pk):
+    """Encode a media pk (int, digit string or "pk_userid" id) as a shortcode"""
+    media_pk = int(str(media_pk).split('_')[0])
+    if media_pk <= 0:
+        raise ValueError(f"Invalid media pk: {media_pk}")
+    chars = []
+    while media_pk > 0:
+        media_pk, remainder = divmod(media_pk, 64)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def shortcodes_to_pks(shortcodes):
+    """Decode a list of shortcodes; invalid entries map to None"""
+    return [_try(shortcode_to_pk, shortcode) for shortcode in shortcodes]
+
+
+def pks_to_shortcodes(media_pks):
+    """Encode a list of media pks; invalid entries map to None"""
+    return [_try(pk_to_shortcode, media_pk) for media_pk in media_pks]
+
+
+def _try(convert, value):
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return None
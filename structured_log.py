@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Structured Logging
+Compact JSON log events with a stable schema, written to the diagnostic channel (stderr)
+"""
+
+import sys
+import json
+import logging
+from datetime import datetime, timezone
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line: ts, level, logger, event, msg plus event fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, 'event', 'log'),
+            "msg": record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def configure_logging(log_format='text', level='INFO', stream=None):
+    """Send all diagnostic logging to stderr (or stream) in text or JSON form"""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if log_format == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+
+def log_event(logger, level, event, message, **fields):
+    """Log a named event with structured fields, skipping all work when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"event": event, "fields": fields})
+
+
+def debug_dump(logger, label, obj):
+    """Log an object's type and public attributes, computed only when DEBUG is enabled"""
+    if logger.isEnabledFor(logging.DEBUG):
+        attributes = [attr for attr in dir(obj) if not attr.startswith('_')]
+        keys = list(obj.__dict__.keys()) if hasattr(obj, '__dict__') else None
+        logger.debug(f"{label}: type={type(obj)}, attributes={attributes}, dict keys={keys}")
@@ -1 +1,123 @@
-// ...existing code moved from root test_json_handling.js...
+/**
+ * Test script for the RecordReader that reassembles records from the Python output channel
+ * Feeds frames split at awkward chunk boundaries and checks every record arrives intact
+ */
+
+const assert = require('assert');
+const chalk = require('chalk');
+const { RecordReader } = require('../record-reader');
+
+function collect(format) {
+  const records = [];
+  const errors = [];
+  const reader = new RecordReader(format, record => records.push(record), (error, frame) => errors.push(frame));
+  return { reader, records, errors };
+}
+
+// Feed a buffer one slice at a time, cutting at every given byte offset
+function feed(reader, buffer, cuts) {
+  let start = 0;
+  for (const cut of [...cuts, buffer.length]) {
+    reader.push(buffer.subarray(start, cut));
+    start = cut;
+  }
+}
+
+function testNdjsonSplitAcrossChunks() {
+  console.log(chalk.blue('Test 1: NDJSON records split across chunks'));
+  const records = [
+    { type: 'content', data: { username: 'test', url: 'https://instagram.com/p/ABC123/' } },
+    { type: 'status', data: { state: 'ready' } }
+  ];
+  const buffer = Buffer.from(records.map(record => JSON.stringify(record) + '\n').join(''), 'utf8');
+
+  // Every possible single cut, including ones right before and after the newline
+  for (let cut = 0; cut <= buffer.length; cut++) {
+    const { reader, records: got, errors } = collect('ndjson');
+    feed(reader, buffer, [cut]);
+    assert.deepStrictEqual(got, records, `records differ when cut at byte ${cut}`);
+    assert.strictEqual(errors.length, 0);
+  }
+
+  // One byte per chunk
+  const { reader, records: got } = collect('ndjson');
+  feed(reader, buffer, [...Array(buffer.length).keys()].slice(1));
+  assert.deepStrictEqual(got, records);
+  console.log(chalk.green('✅ Records reassembled at every split point'));
+}
+
+function testNdjsonSplitInsideMultiByteCharacter() {
+  console.log(chalk.blue('\nTest 2: NDJSON split inside a multi-byte UTF-8 character'));
+  const record = { type: 'content', data: { caption: "Without DevOps, it's just dev-oops 😬⚠️ café" } };
+  const buffer = Buffer.from(JSON.stringify(record) + '\n', 'utf8');
+  const emoji = buffer.indexOf(Buffer.from('😬', 'utf8'));
+
+  // Cut inside the 4-byte emoji at each interior offset
+  for (const cut of [emoji + 1, emoji + 2, emoji + 3]) {
+    const { reader, records, errors } = collect('ndjson');
+    feed(reader, buffer, [cut]);
+    assert.deepStrictEqual(records, [record], `caption garbled when cut at byte ${cut}`);
+    assert.strictEqual(errors.length, 0);
+  }
+  console.log(chalk.green('✅ Multi-byte characters survive chunk boundaries'));
+}
+
+function testNdjsonBadLine() {
+  console.log(chalk.blue('\nTest 3: NDJSON line that fails to parse'));
+  const { reader, records, errors } = collect('ndjson');
+  reader.push(Buffer.from('{"type": "content", "data": {"username": "test_user"\n{"type": "status", "data": {}}\n\n'));
+  assert.deepStrictEqual(records, [{ type: 'status', data: {} }]);
+  assert.strictEqual(errors.length, 1);
+  assert.ok(errors[0].toString().startsWith('{"type": "content"'));
+  console.log(chalk.green('✅ Bad line reported and the next record still read'));
+}
+
+// Length-prefixed frame around a msgpack map {type: <type>, data: {n: <n>}} encoded by hand
+function msgpackFrame(type, n) {
+  const str = value => Buffer.concat([Buffer.from([0xa0 | Buffer.byteLength(value)]), Buffer.from(value)]);
+  const body = Buffer.concat([
+    Buffer.from([0x82]), str('type'), str(type),
+    str('data'), Buffer.from([0x81]), str('n'), Buffer.from([n])
+  ]);
+  const length = Buffer.alloc(4);
+  length.writeUInt32BE(body.length);
+  return Buffer.concat([length, body]);
+}
+
+function testMsgpackFrames() {
+  console.log(chalk.blue('\nTest 4: Length-prefixed msgpack frames'));
+  try {
+    require.resolve('@msgpack/msgpack');
+  } catch (error) {
+    console.log(chalk.yellow('⚠️  @msgpack/msgpack is not installed, skipping'));
+    return;
+  }
+  const buffer = Buffer.concat([msgpackFrame('content', 1), msgpackFrame('status', 2)]);
+  const expected = [{ type: 'content', data: { n: 1 } }, { type: 'status', data: { n: 2 } }];
+
+  // Every cut, including ones inside the 4-byte length prefix
+  for (let cut = 0; cut <= buffer.length; cut++) {
+    const { reader, records, errors } = collect('msgpack');
+    feed(reader, buffer, [cut]);
+    assert.deepStrictEqual(records, expected, `records differ when cut at byte ${cut}`);
+    assert.strictEqual(errors.length, 0);
+  }
+
+  // An incomplete frame waits for the rest instead of emitting
+  const { reader, records } = collect('msgpack');
+  reader.push(buffer.subarray(0, 6));
+  assert.strictEqual(records.length, 0);
+  console.log(chalk.green('✅ Frames reassembled at every split point'));
+}
+
+function testRecordReader() {
+  console.log(chalk.cyan('🧪 Testing RecordReader framing\n'));
+  testNdjsonSplitAcrossChunks();
+  testNdjsonSplitInsideMultiByteCharacter();
+  testNdjsonBadLine();
+  testMsgpackFrames();
+  console.log(chalk.cyan('\n🎉 RecordReader test completed!'));
+}
+
+// Run the test
+testRecordReader();
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+URL Extractor
+Single-pass extraction of Instagram post, reel and tv links from free text into canonical (kind, shortcode) pairs
+"""
+
+import re
+
+# Anchored on the host; the scheme, www./m. prefix, an optional username path segment and any trailing
+# query string or fragment are simply not consumed. audio/ pages under reels/ are not posts
+POST_LINK_PATTERN = re.compile(
+    r"(?<![\w-])instagr(?:am\.com|\.am)/(?:[A-Za-z0-9_.]{1,30}/)?(p|reels?|tv)/(?!audio/)([A-Za-z0-9_-]{5,})",
+    re.IGNORECASE
+)
+
+KIND_ALIASES = {"p": "p", "reel": "reel", "reels": "reel", "tv": "tv"}
+
+
+def find_post_links(text):
+    """Return unique (kind, shortcode) pairs for every post link in text, in order of appearance"""
+    # IGNORECASE keeps the regex from skipping ahead on the literal host, so rule out link-free text first
+    if not text or 'instagr' not in text.lower():
+        return []
+    found = POST_LINK_PATTERN.findall(text)
+    if len(found) < 2:
+        return [(KIND_ALIASES[kind.lower()], shortcode) for kind, shortcode in found]
+    links = []
+    seen = set()
+    for kind, shortcode in found:
+        if shortcode not in seen:
+            seen.add(shortcode)
+            links.append((KIND_ALIASES[kind.lower()], shortcode))
+    return links
+
+
+def parse_post_url(url):
+    """Return the (kind, shortcode) of the first post link in url, or None"""
+    links = find_post_links(str(url))
+    return links[0] if links else None
+
+
+def canonical_url(kind, shortcode):
+    """Build the canonical https://www.instagram.com/<kind>/<shortcode>/ URL"""
+    return f"https://www.instagram.com/{kind}/{shortcode}/"
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Work Queue
+Durable SQLite queue of discovered post URLs with per-job retry backoff, attempt caps and crash-safe resume
+"""
+
+import os
+import time
+import random
+import sqlite3
+import logging
+import threading
+
+from message_store import to_epoch
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = "pending"
+STATE_INFLIGHT = "inflight"
+STATE_DONE = "done"
+STATE_DEAD = "dead"
+STATES = (STATE_PENDING, STATE_INFLIGHT, STATE_DONE, STATE_DEAD)
+
+
+class WorkQueue:
+    def __init__(self, path='work_queue.db', max_attempts=6, base_delay=30.0, max_delay=3600.0, retention_days=7):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                message_id TEXT NOT NULL,
+                thread_id TEXT,
+                message_ts REAL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                last_error TEXT,
+                UNIQUE (message_id, url)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (state, next_attempt_at)")
+        self._conn.commit()
+        self.recover()
+
+    @classmethod
+    def from_env(cls):
+        """Create a queue configured from INSTAGRAM_QUEUE_* environment variables"""
+        return cls(
+            path=os.getenv('INSTAGRAM_QUEUE_DB', 'work_queue.db'),
+            max_attempts=int(os.getenv('INSTAGRAM_QUEUE_MAX_ATTEMPTS', '6')),
+            base_delay=float(os.getenv('INSTAGRAM_QUEUE_BACKOFF', '30')),
+            max_delay=float(os.getenv('INSTAGRAM_QUEUE_MAX_BACKOFF', '3600')),
+            retention_days=float(os.getenv('INSTAGRAM_QUEUE_RETENTION_DAYS', '7'))
+        )
+
+    def recover(self):
+        """Return jobs left in flight by a crash or restart to the pending state"""
+        with self._lock:
+            recovered = self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+                (STATE_PENDING, time.time(), STATE_INFLIGHT)
+            ).rowcount
+            self._conn.commit()
+        if recovered:
+            logger.info(f"Resuming {recovered} extraction jobs that were in flight at shutdown")
+        return recovered
+
+    def enqueue(self, url, message_id, thread_id=None, timestamp=None):
+        """Durably queue a URL found in a message; returns the job id, or None if it was already queued"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """INSERT OR IGNORE INTO jobs (url, message_id, thread_id, message_ts, state, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, str(message_id), str(thread_id) if thread_id else None, to_epoch(timestamp), STATE_PENDING, now, now, now)
+            )
+            self._conn.commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, limit):
+        """Mark up to limit due pending jobs in flight and return them oldest first"""
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT job_id, url, message_id, thread_id, attempts FROM jobs
+                WHERE state = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, job_id LIMIT ?""",
+                (STATE_PENDING, now, limit)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE job_id = ?",
+                ((STATE_INFLIGHT, now, row[0]) for row in rows)
+            )
+            self._conn.commit()
+        return [
+            {"job_id": job_id, "url": url, "message_id": message_id, "thread_id": thread_id, "attempts": attempts}
+            for job_id, url, message_id, thread_id, attempts in rows
+        ]
+
+    def is_last_attempt(self, job):
+        return job["attempts"] + 1 >= self.max_attempts
+
+    def complete(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ?, last_error = NULL WHERE job_id = ?",
+                (STATE_DONE, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def fail(self, job_id, error):
+        """Record a failed attempt; returns (state, retry delay in seconds or None once the job is dead)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if attempts >= self.max_attempts:
+                state, delay = STATE_DEAD, None
+            else:
+                # Exponential backoff with jitter so a burst of failures does not retry in lockstep
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1)) * self._random.uniform(0.8, 1.2)
+                state = STATE_PENDING
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = ?, next_attempt_at = ?, updated_at = ?, last_error = ? WHERE job_id = ?",
+                (state, attempts, now + (delay or 0), now, str(error)[:500], job_id)
+            )
+            self._conn.commit()
+        return state, delay
+
+    def next_due_in(self):
+        """Seconds until the next pending job is due (0 if one is due now), or None when nothing is pending"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM jobs WHERE state = ?", (STATE_PENDING,)
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def get_stats(self):
+        """Return job counts per state, queue depth and the age of the oldest unfinished job"""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE state IN (?, ?)", (STATE_PENDING, STATE_INFLIGHT)
+            ).fetchone()[0]
+        stats = {state: counts.get(state, 0) for state in STATES}
+        stats["depth"] = stats[STATE_PENDING] + stats[STATE_INFLIGHT]
+        stats["oldest_age_seconds"] = round(now - oldest, 1) if oldest else 0.0
+        return stats
+
+    def prune(self, retention_days=None):
+        """Delete done and dead jobs last touched more than retention_days ago"""
+        retention_days = self.retention_days if retention_days is None else retention_days
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (STATE_DONE, STATE_DEAD, time.time() - retention_days * 86400)
+            ).rowcount
+            self._conn.commit()
+        if deleted:
+            logger.info(f"Pruned {deleted} finished extraction jobs older than {retention_days} days")
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()